@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import re
+import logging
+import threading
+
+HEALTH_FILE = os.path.join("cache", "api_health.json")
+
+EWMA_WEIGHT = 0.3
+LATENCY_SCALE = 5.0
+QUARANTINE_AFTER = 3
+QUARANTINE_SECONDS = 1800
+REPROBE_SECONDS = 3600
+
+# Only errors that say something about the endpoint itself; private accounts,
+# login walls and deleted videos fail the same way on every strategy, and 429s
+# throttle the whole IP, which the rate limiter already handles
+SERVER_ERROR_RE = re.compile(r"HTTP Error 5\d\d")
+TRANSPORT_ERROR_KEYWORDS = (
+    "timed out",
+    "connection",
+    "urlopen error",
+    "remote end closed",
+    "name resolution",
+    "ssl",
+    "incompleteread",
+)
+
+
+def is_host_failure(error: Exception) -> bool:
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+
+    error_str = str(error)
+    if SERVER_ERROR_RE.search(error_str):
+        return True
+    return any(kw in error_str.lower() for kw in TRANSPORT_ERROR_KEYWORDS)
+
+
+class StrategyHealth:
+    def __init__(self, path: str = HEALTH_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.probed = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.stats = json.load(f)
+        except FileNotFoundError:
+            self.stats = {}
+        except Exception as e:
+            logging.warning(f"⚠️ Could not read {self.path}: {e}")
+            self.stats = {}
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.stats, indent=2)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def record(self, name: str, ok: bool, latency: float):
+        with self.lock:
+            stat = self.stats.setdefault(name, {
+                "attempts": 0,
+                "successes": 0,
+                "success_rate": 0.5,
+                "latency": latency,
+                "consecutive_failures": 0,
+                "quarantined_until": 0,
+            })
+
+            stat["attempts"] += 1
+            stat["last_tried"] = time.time()
+            stat["success_rate"] = (1 - EWMA_WEIGHT) * stat["success_rate"] + EWMA_WEIGHT * (1.0 if ok else 0.0)
+            stat["latency"] = (1 - EWMA_WEIGHT) * stat["latency"] + EWMA_WEIGHT * latency
+
+            if ok:
+                stat["successes"] += 1
+                stat["consecutive_failures"] = 0
+                stat["quarantined_until"] = 0
+                return
+
+            stat["consecutive_failures"] += 1
+            if stat["consecutive_failures"] >= QUARANTINE_AFTER:
+                stat["quarantined_until"] = time.time() + QUARANTINE_SECONDS
+                logging.warning(
+                    f"🚧 Strategy {name} quarantined for {QUARANTINE_SECONDS // 60} minutes "
+                    f"after {stat['consecutive_failures']} failures"
+                )
+
+    def score(self, name: str) -> float:
+        stat = self.stats.get(name)
+        if not stat:
+            return 0.5
+        return stat["success_rate"] / (1 + stat["latency"] / LATENCY_SCALE)
+
+    def is_quarantined(self, name: str) -> bool:
+        stat = self.stats.get(name)
+        return bool(stat) and stat["quarantined_until"] > time.time()
+
+    def _rank(self, name: str) -> tuple:
+        # Healthy strategies by score, then untried ones in the caller's order, then
+        # those whose last attempt failed; a slow success alone never demotes one
+        stat = self.stats.get(name)
+        if not stat:
+            return (1, 0.0)
+        return (2 if stat["consecutive_failures"] else 0, -self.score(name))
+
+    def _last_seen(self, name: str) -> float:
+        return max(self.stats.get(name, {}).get("last_tried", 0), self.probed.get(name, 0))
+
+    def order(self, names: list) -> list:
+        now = time.time()
+        with self.lock:
+            available = [n for n in names if not self.is_quarantined(n)]
+            if not available:
+                # Everything is quarantined: try the one released soonest
+                return sorted(names, key=lambda n: self.stats[n]["quarantined_until"])
+
+            ranked = sorted(available, key=self._rank)
+            # A strategy nobody has tried for a while goes first once, so its score can recover
+            stale = [n for n in ranked if now - self._last_seen(n) >= REPROBE_SECONDS]
+            if stale:
+                self.probed[stale[0]] = now
+                ranked.remove(stale[0])
+                ranked.insert(0, stale[0])
+            return ranked
+
+    def summary(self) -> str:
+        with self.lock:
+            parts = []
+            for name, stat in sorted(self.stats.items(), key=lambda item: -self.score(item[0])):
+                flag = " (quarantined)" if self.is_quarantined(name) else ""
+                parts.append(
+                    f"{name}={stat['success_rate']:.2f}/{stat['latency']:.1f}s{flag}"
+                )
+            return ", ".join(parts)
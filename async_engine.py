@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics
+
+DEFAULT_ASYNC_CONFIG = {
+    "enabled": False,
+    "io_workers": 16,
+}
+
+
+def load_async_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_ASYNC_CONFIG)
+    cfg.update(config.get("async_engine", {}))
+    # The engine fans out whole accounts; it has no staged pipeline to hand them to
+    if cfg["enabled"] and config.get("pipeline", {}).get("enabled", False):
+        raise ValueError("async_engine and pipeline cannot both be enabled")
+    return cfg
+
+
+class AsyncEngine:
+    # A run's driver (config, DB reads, journal, flushes) executes on one thread while the
+    # accounts fan out as coroutines on the event loop. Each of the `concurrency` lanes paces
+    # itself like a pool worker, but only yt-dlp/ffmpeg/DB work takes an io_workers thread;
+    # politeness delays are plain awaits and hold no thread at all.
+    def __init__(self, cfg: dict):
+        self.cfg = cfg
+        self.loop = None
+        self.driver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="run")
+        self.io_pool = ThreadPoolExecutor(max_workers=max(1, int(cfg["io_workers"])), thread_name_prefix="io")
+
+    async def run(self, fn, *args):
+        self.loop = asyncio.get_running_loop()
+        return await self.loop.run_in_executor(self.driver, fn, *args)
+
+    def run_once(self, fn):
+        try:
+            return asyncio.run(self.run(fn))
+        finally:
+            self.close()
+
+    def crawl(self, groups: list, handle, before, after, concurrency: int):
+        # Called from the driver thread; blocks it until every account is done
+        future = asyncio.run_coroutine_threadsafe(
+            self._crawl(groups, handle, before, after, concurrency), self.loop
+        )
+        return future.result()
+
+    async def _crawl(self, groups: list, handle, before, after, concurrency: int):
+        lanes = asyncio.Semaphore(max(1, concurrency))
+        logging.info(
+            f"🌀 Async engine: {len(groups)} account(s), {concurrency} lane(s), "
+            f"{self.cfg['io_workers']} io worker(s)"
+        )
+        await asyncio.gather(*(self._crawl_one(group, handle, before, after, lanes) for group in groups))
+
+    async def _pause(self, seconds: float):
+        if seconds > 0:
+            logging.info(f"⏳ Waiting {seconds}s...")
+            with metrics.span("delay"):
+                await asyncio.sleep(seconds)
+
+    async def _crawl_one(self, group: dict, handle, before, after, lanes: asyncio.Semaphore):
+        async with lanes:
+            await self._pause(before())
+            try:
+                await self.loop.run_in_executor(self.io_pool, handle, group)
+            finally:
+                # Like the worker pool, the delay holds this lane back before its next account
+                await self._pause(after())
+
+    def serve(self, trigger, fn, timezone: str, run_on_startup: bool = False):
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+        async def forever():
+            scheduler = AsyncIOScheduler(timezone=timezone)
+            scheduler.add_job(self.run, trigger, args=[fn], id="tiktok_downloader", replace_existing=True)
+
+            if run_on_startup:
+                logging.info("🚀 Running on startup...")
+                await self.run(fn)
+
+            scheduler.start()
+            logging.info("Async scheduler started. Press Ctrl+C to exit.")
+            await asyncio.Event().wait()
+
+        try:
+            asyncio.run(forever())
+        except (KeyboardInterrupt, SystemExit):
+            logging.info("Scheduler stopped.")
+        finally:
+            self.close()
+
+    def close(self):
+        self.driver.shutdown(wait=False)
+        self.io_pool.shutdown(wait=False)
@@ -0,0 +1,267 @@
+import os
+import time
+import shutil
+import logging
+import threading
+
+from db import db_adapter as db
+from metrics import metrics
+from transcode import run_ffmpeg
+
+INDEX_FILE = os.path.join("cache", "audio_index.sqlite")
+HOT = "hot"
+ARCHIVE = "archive"
+EVICTION_POLICIES = ("lru", "age")
+GB = 1024 ** 3
+DB_BATCH = 500
+
+DEFAULT_RETENTION_CONFIG = {
+    "enabled": False,
+    "max_size_gb": 50,
+    "max_age_days": 0,
+    "policy": "lru",
+    "low_watermark": 0.9,
+    "archive_dir": "",
+    "archive_opus_kbps": 0,
+    "archive_max_size_gb": 0,
+}
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    tier TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS audio_files_accessed_idx ON audio_files (tier, accessed_at);
+CREATE INDEX IF NOT EXISTS audio_files_added_idx ON audio_files (tier, added_at);
+CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def load_retention_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_RETENTION_CONFIG)
+    cfg.update(config.get("retention", {}))
+    if cfg["policy"] not in EVICTION_POLICIES:
+        raise ValueError(f"Unknown eviction policy: {cfg['policy']}")
+    return cfg
+
+
+def is_partial(name: str) -> bool:
+    return ".part" in name or name.endswith(".ytdl")
+
+
+class AudioIndex:
+    # Local SQLite record of every stored audio file with its size and last access,
+    # so quota checks are a SUM() instead of a walk over downloads/audio
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.enabled = False
+
+    def configure(self, cfg: dict):
+        self.enabled = cfg["enabled"]
+
+    def _db(self):
+        if self.conn is None:
+            import sqlite3
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(INDEX_SCHEMA)
+        return self.conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self.lock:
+            return self._db().execute(sql, params).fetchall()
+
+    def record(self, path: str, size: int, tier: str = HOT):
+        if not self.enabled:
+            return
+        now = time.time()
+        self._execute("""
+            INSERT INTO audio_files (path, size, tier, added_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (path) DO UPDATE SET size = excluded.size, tier = excluded.tier, accessed_at = excluded.accessed_at
+        """, (path, size, tier, now, now))
+
+    def touch(self, path: str):
+        if self.enabled:
+            self._execute("UPDATE audio_files SET accessed_at = ? WHERE path = ?", (time.time(), path))
+
+    def forget(self, path: str):
+        if self.enabled:
+            self._execute("DELETE FROM audio_files WHERE path = ?", (path,))
+
+    def replace(self, old_path: str, new_path: str, size: int, tier: str = None):
+        # Keeps the old entry's tier and access time unless a new tier is given
+        if not self.enabled:
+            return
+        with self.lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            old = conn.execute("SELECT tier, added_at, accessed_at FROM audio_files WHERE path = ?", (old_path,)).fetchone()
+            now = time.time()
+            old_tier, added_at, accessed_at = old or (HOT, now, now)
+            conn.execute("DELETE FROM audio_files WHERE path = ?", (old_path,))
+            conn.execute("""
+                INSERT OR REPLACE INTO audio_files (path, size, tier, added_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+            """, (new_path, size, tier or old_tier, added_at, accessed_at))
+            conn.execute("COMMIT")
+
+    def total_size(self, tier: str) -> int:
+        return self._execute("SELECT COALESCE(SUM(size), 0) FROM audio_files WHERE tier = ?", (tier,))[0][0]
+
+    def older_than(self, tier: str, column: str, cutoff: float) -> list:
+        return self._execute(
+            f"SELECT path, size FROM audio_files WHERE tier = ? AND {column} < ? ORDER BY {column}", (tier, cutoff)
+        )
+
+    def coldest(self, tier: str, column: str, needed: int, skip: set) -> list:
+        # Walks the index in eviction order until enough bytes are covered
+        victims = []
+        with self.lock:
+            cursor = self._db().execute(f"SELECT path, size FROM audio_files WHERE tier = ? ORDER BY {column}", (tier,))
+            for path, size in cursor:
+                if needed <= 0:
+                    break
+                if path in skip:
+                    continue
+                victims.append((path, size))
+                needed -= size
+            cursor.close()
+        return victims
+
+    def ensure_built(self, audio_dir: str, exclude_dir: str = ""):
+        # Files stored before retention was enabled are indexed once, by walking the directory
+        if self._execute("SELECT 1 FROM index_state WHERE key = 'built'"):
+            return
+
+        exclude = os.path.abspath(exclude_dir) if exclude_dir else None
+        rows = []
+        for root, dirs, files in os.walk(audio_dir):
+            if exclude:
+                dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude]
+            for name in files:
+                if is_partial(name):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                rows.append((os.path.join(root, name), stat.st_size, HOT, stat.st_mtime, stat.st_mtime))
+
+        with self.lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            conn.executemany("""
+                INSERT INTO audio_files (path, size, tier, added_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO NOTHING
+            """, rows)
+            conn.execute("INSERT OR REPLACE INTO index_state (key, value) VALUES ('built', ?)", (str(time.time()),))
+            conn.execute("COMMIT")
+        logging.info(f"🗂️ Indexed {len(rows)} existing audio file(s) under {audio_dir}")
+
+
+def archive_path(path: str, audio_dir: str, cfg: dict) -> str:
+    relative = os.path.relpath(path, audio_dir)
+    if relative.startswith(".."):
+        relative = os.path.basename(path)
+    dst = os.path.join(cfg["archive_dir"], relative)
+    if cfg["archive_opus_kbps"]:
+        dst = os.path.splitext(dst)[0] + ".opus"
+    return dst
+
+
+def delete_files(index: AudioIndex, victims: list, reason: str) -> int:
+    freed = 0
+    for i in range(0, len(victims), DB_BATCH):
+        batch = victims[i:i + DB_BATCH]
+        # Posts are unlinked first; if that fails the files stay where the posts expect them
+        if not db.forget_audio_paths([path for path, _ in batch]):
+            logging.error("❌ Could not unlink evicted audio from yt_post, keeping the files")
+            break
+
+        for path, size in batch:
+            if os.path.exists(path):
+                os.remove(path)
+            index.forget(path)
+            freed += size
+        metrics.inc("audio_evictions_total", len(batch), action="delete", reason=reason)
+    return freed
+
+
+def archive_files(index: AudioIndex, victims: list, audio_dir: str, cfg: dict) -> int:
+    freed = 0
+    for i in range(0, len(victims), DB_BATCH):
+        copied = []
+        missing = []
+        for path, size in victims[i:i + DB_BATCH]:
+            if not os.path.exists(path):
+                missing.append((path, size))
+                continue
+
+            dst = archive_path(path, audio_dir, cfg)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                if cfg["archive_opus_kbps"]:
+                    run_ffmpeg(path, dst, ["-codec:a", "libopus", "-b:a", f"{cfg['archive_opus_kbps']}k"])
+                else:
+                    shutil.copy2(path, dst)
+            except Exception as e:
+                logging.error(f"❌ Could not archive {path}: {str(e)[:100]}")
+                continue
+            copied.append((path, size, dst))
+
+        if missing:
+            delete_files(index, missing, "missing")
+
+        # The originals are only removed once yt_post points at the archived copies
+        if not db.update_audio_paths([(path, dst) for path, _, dst in copied]):
+            logging.error("❌ Could not repoint yt_post to archived audio, keeping the originals")
+            for _, _, dst in copied:
+                os.remove(dst)
+            break
+
+        for path, size, dst in copied:
+            os.remove(path)
+            index.replace(path, dst, os.path.getsize(dst), ARCHIVE)
+            freed += size
+        metrics.inc("audio_evictions_total", len(copied), action="archive", reason="quota")
+    return freed
+
+
+def enforce_retention(index: AudioIndex, cfg: dict, audio_dir: str) -> int:
+    if not cfg["enabled"]:
+        return 0
+
+    index.ensure_built(audio_dir, cfg["archive_dir"])
+    column = "accessed_at" if cfg["policy"] == "lru" else "added_at"
+
+    victims = []
+    if cfg["max_age_days"]:
+        victims = index.older_than(HOT, column, time.time() - float(cfg["max_age_days"]) * 86400)
+
+    total = index.total_size(HOT) - sum(size for _, size in victims)
+    limit = float(cfg["max_size_gb"]) * GB
+    if limit and total > limit:
+        # Evict down to the low watermark so the next run doesn't start at the limit again
+        needed = total - limit * float(cfg["low_watermark"])
+        victims += index.coldest(HOT, column, needed, {path for path, _ in victims})
+
+    if not victims:
+        return 0
+
+    logging.info(f"🧊 Evicting {len(victims)} audio file(s), hot tier at {index.total_size(HOT) / GB:.2f} GB")
+    if cfg["archive_dir"]:
+        freed = archive_files(index, victims, audio_dir, cfg)
+    else:
+        freed = delete_files(index, victims, "quota")
+
+    archive_limit = float(cfg["archive_max_size_gb"]) * GB
+    archived = index.total_size(ARCHIVE)
+    if cfg["archive_dir"] and archive_limit and archived > archive_limit:
+        needed = archived - archive_limit * float(cfg["low_watermark"])
+        delete_files(index, index.coldest(ARCHIVE, column, needed, set()), "archive_quota")
+
+    logging.info(f"🧊 Freed {freed / GB:.2f} GB, hot tier now {index.total_size(HOT) / GB:.2f} GB")
+    return freed
@@ -0,0 +1,40 @@
+import os
+import hashlib
+
+BLOB_DIR = os.path.join("downloads", "audio", "blobs")
+HASH_CHUNK = 1024 * 1024
+
+DEFAULT_STORAGE_CONFIG = {
+    "content_addressed": True,
+}
+
+
+def load_storage_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_STORAGE_CONFIG)
+    cfg.update(config.get("storage", {}))
+    return cfg
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(digest: str, ext: str, blob_dir: str = BLOB_DIR) -> str:
+    return os.path.join(blob_dir, digest[:2], f"{digest}{ext}")
+
+
+def store_blob(path: str, digest: str = None, blob_dir: str = BLOB_DIR) -> tuple:
+    digest = digest or file_digest(path)
+    dst = blob_path(digest, os.path.splitext(path)[1], blob_dir)
+
+    if os.path.exists(dst):
+        os.remove(path)
+        return digest, dst, False
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(path, dst)
+    return digest, dst, True
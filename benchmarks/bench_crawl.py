@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = "10,100,1000"
+STAGES = ("resolve", "listing", "download", "transcode", "store", "db", "delay")
+
+
+def bench_config(args) -> dict:
+    return {
+        "crawler": {"concurrency": args.concurrency, "db_batch_size": 20},
+        "adaptive_schedule": {"enabled": True},
+        "rate_limits": {
+            "metadata": {"rate_per_minute": args.rate_per_minute, "burst": 20},
+            "media": {"rate_per_minute": args.rate_per_minute, "burst": 20},
+            "breaker": {"cooldown_min_seconds": 1, "cooldown_max_seconds": 2, "max_wait_seconds": 5},
+        },
+        "pipeline": {
+            "enabled": args.pipeline,
+            "discovery_workers": args.concurrency,
+            "download_workers": args.concurrency,
+            "transcode_workers": 1,
+            "queue_size": 20,
+            "report_interval_seconds": 3600,
+        },
+        # Fake media is random bytes ffmpeg could not demux, so keep the file path
+        "audio": {"output": "native", "streaming": False},
+        "cluster": {"enabled": False},
+        "identities": {"enabled": False},
+        "journal": {"enabled": True},
+        "metrics": {"enabled": False},
+        "async_engine": {
+            "enabled": args.async_engine,
+            "io_workers": args.io_workers,
+        },
+    }
+
+
+def stage_stats(metrics) -> dict:
+    stats = {}
+    with metrics.lock:
+        series = metrics.histograms.get("crawl_stage_seconds", {})
+        for key, hist in series.items():
+            stats[dict(key)["stage"]] = {
+                "count": hist["count"],
+                "mean_ms": round(hist["sum"] / hist["count"] * 1000, 1) if hist["count"] else 0.0,
+                "total_s": round(hist["sum"], 2),
+            }
+    return stats
+
+
+def run_single(args) -> dict:
+    # Runs in its own process so CPU time and peak RSS belong to this size only
+    workdir = tempfile.mkdtemp(prefix="tiktok_bench_")
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import_started = time.perf_counter()
+    import tiktok_audio_downloader as tad
+    import run_journal
+    import cluster
+    from metrics import metrics
+    from fake_db import InMemoryDB, make_groups
+    from fake_tiktok import FakeTikTok, FakeYoutubeDLPool
+    import_seconds = time.perf_counter() - import_started
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    tiktok = FakeTikTok(
+        videos=args.videos, latency=args.latency_ms / 1000, media_latency=args.media_latency_ms / 1000,
+        throttle_rate=args.throttle_rate, auth_fail_rate=args.auth_fail_rate, media_bytes=args.media_kb * 1024,
+        sounds=args.sounds,
+    )
+    new_cutoff = tiktok.timestamps()[min(args.new_videos, args.videos - 1)]
+    fake_db = InMemoryDB(make_groups(args.accounts, new_cutoff), latency=args.db_latency_ms / 1000)
+
+    tad.db = run_journal.db = cluster.db = fake_db
+    tad.ydl_pool = FakeYoutubeDLPool(tiktok)
+    tad.load_config = lambda: bench_config(args)
+    tad.random_delay = lambda *a, **k: time.sleep(args.delay_s)
+    tad.pick_delay = lambda *a, **k: args.delay_s
+    tad.COOKIE_REFRESH_ENABLED = False
+    tad.AUDIO_DIR = os.path.join(workdir, "audio")
+
+    # Sampled in the background, since idle waits are what the engines differ on
+    peak_threads = [threading.active_count()]
+    sampling = threading.Event()
+
+    def sample_threads():
+        while not sampling.wait(0.05):
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+
+    threading.Thread(target=sample_threads, daemon=True).start()
+
+    cpu_started = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    if args.async_engine:
+        tad.start_async_engine(bench_config(args)).run_once(tad.main)
+    else:
+        tad.main()
+    elapsed = time.perf_counter() - started
+    cpu_ended = resource.getrusage(resource.RUSAGE_SELF)
+    sampling.set()
+
+    cpu_seconds = (cpu_ended.ru_utime - cpu_started.ru_utime) + (cpu_ended.ru_stime - cpu_started.ru_stime)
+    return {
+        "accounts": args.accounts,
+        "mode": "async" if args.async_engine else "pipeline" if args.pipeline else "pool",
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 2),
+        "accounts_per_minute": round(args.accounts / elapsed * 60, 1),
+        "posts_saved": len(fake_db.posts),
+        "db_calls": fake_db.calls,
+        "requests": tiktok.requests,
+        "cpu_seconds": round(cpu_seconds, 2),
+        "peak_rss_mb": round(cpu_ended.ru_maxrss / 1024, 1),
+        "peak_threads": peak_threads[0],
+        "import_seconds": round(import_seconds, 3),
+        "stages": stage_stats(metrics),
+    }
+
+
+def child_args(args, accounts: int) -> list:
+    argv = [
+        sys.executable, os.path.abspath(__file__), "--single", str(accounts),
+        "--concurrency", str(args.concurrency), "--videos", str(args.videos),
+        "--new-videos", str(args.new_videos), "--latency-ms", str(args.latency_ms),
+        "--media-latency-ms", str(args.media_latency_ms), "--db-latency-ms", str(args.db_latency_ms),
+        "--throttle-rate", str(args.throttle_rate), "--auth-fail-rate", str(args.auth_fail_rate),
+        "--media-kb", str(args.media_kb), "--rate-per-minute", str(args.rate_per_minute),
+        "--sounds", str(args.sounds), "--delay-s", str(args.delay_s), "--io-workers", str(args.io_workers),
+    ]
+    if args.pipeline:
+        argv.append("--pipeline")
+    if args.async_engine:
+        argv.append("--async")
+    return argv
+
+
+def print_report(results: list):
+    print(f"{'accounts':>8} {'mode':>8} {'secs':>8} {'acc/min':>9} {'posts':>6} {'cpu s':>7} {'rss MB':>7} {'threads':>7}")
+    for r in results:
+        print(
+            f"{r['accounts']:>8} {r['mode']:>8} {r['seconds']:>8} {r['accounts_per_minute']:>9} "
+            f"{r['posts_saved']:>6} {r['cpu_seconds']:>7} {r['peak_rss_mb']:>7} {r['peak_threads']:>7}"
+        )
+        stages = " ".join(
+            f"{stage}={r['stages'][stage]['mean_ms']}ms×{r['stages'][stage]['count']}"
+            for stage in STAGES if stage in r["stages"]
+        )
+        print(f"{'':>8} {stages}")
+        print(f"{'':>8} requests={r['requests']} db_calls={r['db_calls']}")
+
+
+def check_baseline(results: list, baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["accounts"], r["mode"]): r for r in json.load(f)}
+
+    ok = True
+    for r in results:
+        base = baseline.get((r["accounts"], r["mode"]))
+        if not base:
+            continue
+        floor = base["accounts_per_minute"] * (1 - tolerance)
+        if r["accounts_per_minute"] < floor:
+            print(
+                f"REGRESSION: {r['accounts']} accounts ({r['mode']}) ran at {r['accounts_per_minute']} acc/min, "
+                f"baseline {base['accounts_per_minute']} (floor {floor:.1f})"
+            )
+            ok = False
+    return ok
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline crawler benchmark against a fake TikTok and in-memory DB")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated account counts")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pipeline", action="store_true", help="use the staged pipeline instead of the worker pool")
+    parser.add_argument("--async", dest="async_engine", action="store_true", help="use the asyncio engine")
+    parser.add_argument("--io-workers", type=int, default=8, help="blocking-work threads on the asyncio engine")
+    parser.add_argument("--delay-s", type=float, default=0.0, help="politeness delay after each account")
+    parser.add_argument("--videos", type=int, default=10, help="videos listed per account")
+    parser.add_argument("--new-videos", type=int, default=1, help="videos newer than the watermark per account")
+    parser.add_argument("--latency-ms", type=float, default=50, help="mean metadata request latency")
+    parser.add_argument("--media-latency-ms", type=float, default=100, help="mean media download latency")
+    parser.add_argument("--db-latency-ms", type=float, default=1, help="latency of each DB call")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--auth-fail-rate", type=float, default=0.0, help="fraction of requests failing auth")
+    parser.add_argument("--media-kb", type=int, default=64)
+    parser.add_argument("--sounds", type=int, default=0, help="distinct sounds shared by all videos (0 = all unique)")
+    parser.add_argument("--rate-per-minute", type=float, default=1_000_000)
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare accounts/minute against a saved JSON run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.single:
+        args.accounts = args.single
+        print(json.dumps(run_single(args)))
+        sys.exit(0)
+
+    results = []
+    for accounts in [int(n) for n in args.sizes.split(",")]:
+        output = subprocess.run(child_args(args, accounts), capture_output=True, text=True, cwd=ROOT)
+        if output.returncode != 0:
+            print(output.stderr[-2000:])
+            sys.exit(output.returncode)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline and not check_baseline(results, args.baseline, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("yt_dlp", "apscheduler", "playwright", "http.server")
+
+# Imports the crawler and runs main() with no due accounts against the in-memory DB,
+# so only startup cost is measured
+NOOP_RUN = f"""
+import os, sys, json, time, tempfile
+started = time.perf_counter()
+os.chdir(tempfile.mkdtemp(prefix="tiktok_startup_"))
+sys.path[:0] = [{ROOT!r}, {BENCH_DIR!r}]
+import tiktok_audio_downloader as tad
+imported = time.perf_counter()
+import run_journal
+from fake_db import InMemoryDB
+tad.db = run_journal.db = InMemoryDB([])
+tad.load_config = lambda: {{}}
+tad.main()
+finished = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "main_ms": (finished - imported) * 1000,
+    "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", NOOP_RUN], capture_output=True, text=True, cwd=ROOT)
+        if output.returncode != 0:
+            raise RuntimeError(output.stderr[-2000:])
+        samples.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    return {
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "main_ms": round(statistics.median(s["main_ms"] for s in samples), 1),
+        "total_ms": round(statistics.median(s["import_ms"] + s["main_ms"] for s in samples), 1),
+        "loaded": samples[-1]["loaded"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start cost of a run with nothing to crawl")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=150, help="fail when the median total exceeds this")
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(
+        f"import={result['import_ms']}ms main={result['main_ms']}ms total={result['total_ms']}ms "
+        f"(median of {args.runs}, budget {args.budget_ms}ms)"
+    )
+    if result["loaded"]:
+        print(f"heavy modules loaded on a no-op run: {', '.join(result['loaded'])}")
+
+    if result["total_ms"] > args.budget_ms or result["loaded"]:
+        sys.exit(1)
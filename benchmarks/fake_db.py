@@ -0,0 +1,261 @@
+import time
+import threading
+from datetime import datetime, timedelta
+
+
+class InMemoryDB:
+    # Stands in for db.db_adapter: same function names, data kept in dicts.
+    # Every call sleeps `latency` seconds to mimic a Postgres round trip.
+    def __init__(self, groups: list, latency: float = 0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.groups = {g["id"]: dict(g) for g in groups}
+        self.posts = {}
+        self.sec_uids = {}
+        self.blobs = {}
+        self.mp3_failures = {}
+        self.runs = {}
+        self.run_accounts = {}
+        self.nodes = {}
+        self.calls = 0
+
+    def _roundtrip(self):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def ensure_schema(self) -> bool:
+        self._roundtrip()
+        return True
+
+    def fetch_groups(self) -> list:
+        self._roundtrip()
+        with self.lock:
+            return [dict(g) for g in sorted(self.groups.values(), key=lambda g: g["id"])]
+
+    def fetch_due_groups(self, slack_seconds: int = 0) -> list:
+        self._roundtrip()
+        horizon = datetime.now() + timedelta(seconds=slack_seconds)
+        with self.lock:
+            due = [g for g in self.groups.values() if g["next_poll_at"] is None or g["next_poll_at"] <= horizon]
+            return [dict(g) for g in sorted(due, key=lambda g: (g["next_poll_at"] is not None, g["id"]))]
+
+    def current_timestamp(self):
+        self._roundtrip()
+        return datetime.now()
+
+    def lease_groups(self, node_id: str, limit: int, lease_seconds: int, due_only: bool = True,
+                     slack_seconds: int = 0, exclude_ids: list = None, crawled_since=None) -> list:
+        self._roundtrip()
+        now = datetime.now()
+        horizon = now + timedelta(seconds=slack_seconds)
+        exclude = set(exclude_ids or [])
+        leased = []
+        with self.lock:
+            for g in sorted(self.groups.values(), key=lambda g: g["id"]):
+                if len(leased) >= limit:
+                    break
+                if g["id"] in exclude:
+                    continue
+                if g.get("lease_owner") not in (None, node_id) and g["lease_expires_at"] > now:
+                    continue
+                if due_only and g["next_poll_at"] is not None and g["next_poll_at"] > horizon:
+                    continue
+                if crawled_since and g.get("last_crawled_at") and g["last_crawled_at"] >= crawled_since:
+                    continue
+                g["lease_owner"] = node_id
+                g["lease_expires_at"] = now + timedelta(seconds=lease_seconds)
+                leased.append(dict(g))
+        return leased
+
+    def renew_leases(self, node_id: str, lease_seconds: int) -> int:
+        self._roundtrip()
+        with self.lock:
+            owned = [g for g in self.groups.values() if g.get("lease_owner") == node_id]
+            for g in owned:
+                g["lease_expires_at"] = datetime.now() + timedelta(seconds=lease_seconds)
+            return len(owned)
+
+    def release_leases(self, node_id: str, group_ids: list = None, crawled: bool = False) -> bool:
+        self._roundtrip()
+        with self.lock:
+            for g in self.groups.values():
+                if g.get("lease_owner") == node_id and (group_ids is None or g["id"] in group_ids):
+                    g["lease_owner"] = None
+                    g["lease_expires_at"] = None
+                    if crawled and group_ids is not None:
+                        g["last_crawled_at"] = datetime.now()
+        return True
+
+    def record_heartbeat(self, node_id: str, hostname: str, status: str) -> bool:
+        self._roundtrip()
+        with self.lock:
+            self.nodes[node_id] = (hostname, status, datetime.now())
+        return True
+
+    def update_poll_schedules(self, updates: list) -> bool:
+        self._roundtrip()
+        with self.lock:
+            for group_id, interval, cadence in updates:
+                g = self.groups[group_id]
+                g["poll_interval"] = interval
+                g["post_cadence"] = cadence
+                g["next_poll_at"] = datetime.now() + timedelta(seconds=interval)
+        return True
+
+    def update_watermarks(self, updates: list) -> bool:
+        self._roundtrip()
+        with self.lock:
+            for group_id, video_id, video_ts in updates:
+                g = self.groups[group_id]
+                if g["last_video_ts"] is None or video_ts > g["last_video_ts"]:
+                    g["last_video_id"] = video_id
+                    g["last_video_ts"] = video_ts
+        return True
+
+    def get_known_urls(self, urls: list) -> set:
+        self._roundtrip()
+        with self.lock:
+            return {url for url in urls if url in self.posts}
+
+    def insert_yt_posts(self, rows: list) -> bool:
+        self._roundtrip()
+        with self.lock:
+            for video_id, title, url, audio_path, audio_sha256 in rows:
+                self.posts.setdefault(url, (len(self.posts) + 1, video_id, title, audio_path))
+        return True
+
+    def fetch_posts_without_mp3(self, limit: int, after_id: int = 0, exclude_prefix: str = "",
+                                max_failures: int = 3) -> list:
+        self._roundtrip()
+        with self.lock:
+            rows = sorted(
+                (post_id, path) for post_id, _, _, path in self.posts.values()
+                if post_id > after_id and path and not path.lower().endswith(".mp3")
+                and not (exclude_prefix and path.startswith(exclude_prefix))
+                and self.mp3_failures.get(path, 0) < max_failures
+            )
+        return rows[:limit]
+
+    def record_mp3_failures(self, paths: list, permanent: bool = False) -> bool:
+        self._roundtrip()
+        with self.lock:
+            for path in paths:
+                self.mp3_failures[path] = 32767 if permanent else self.mp3_failures.get(path, 0) + 1
+        return True
+
+    def update_audio_paths(self, updates: list) -> bool:
+        self._roundtrip()
+        moved = dict(updates)
+        with self.lock:
+            for url, (post_id, video_id, title, path) in self.posts.items():
+                if path in moved:
+                    self.posts[url] = (post_id, video_id, title, moved[path])
+            for sha256, path in self.blobs.items():
+                if path in moved:
+                    self.blobs[sha256] = moved[path]
+        return True
+
+    def forget_audio_paths(self, paths: list) -> bool:
+        self._roundtrip()
+        gone = set(paths)
+        with self.lock:
+            for url, (post_id, video_id, title, path) in self.posts.items():
+                if path in gone:
+                    self.posts[url] = (post_id, video_id, title, None)
+            self.blobs = {sha256: path for sha256, path in self.blobs.items() if path not in gone}
+        return True
+
+    def get_blob_path(self, sha256: str):
+        self._roundtrip()
+        with self.lock:
+            return self.blobs.get(sha256)
+
+    def save_audio_blob(self, sha256: str, path: str, size: int) -> bool:
+        self._roundtrip()
+        with self.lock:
+            self.blobs[sha256] = path
+        return True
+
+    def get_cached_sec_uid(self, username: str, max_age_seconds: int):
+        self._roundtrip()
+        with self.lock:
+            cached = self.sec_uids.get(username)
+        if cached and time.time() - cached[1] < max_age_seconds:
+            return cached[0]
+        return None
+
+    def save_sec_uid(self, username: str, sec_uid: str) -> bool:
+        self._roundtrip()
+        with self.lock:
+            self.sec_uids[username] = (sec_uid, time.time())
+        return True
+
+    def invalidate_sec_uid(self, username: str) -> bool:
+        self._roundtrip()
+        with self.lock:
+            self.sec_uids.pop(username, None)
+        return True
+
+    def open_run(self, node_id: str, resume_window_seconds: int) -> tuple:
+        self._roundtrip()
+        horizon = datetime.now() - timedelta(seconds=resume_window_seconds)
+        with self.lock:
+            running = [rid for rid, run in self.runs.items()
+                       if run["node_id"] == node_id and run["status"] == "running" and run["started_at"] > horizon]
+            resumed = bool(running)
+            run_id = max(running) if resumed else len(self.runs) + 1
+            if not resumed:
+                self.runs[run_id] = {"node_id": node_id, "status": "running", "started_at": datetime.now()}
+            for rid, run in self.runs.items():
+                if run["node_id"] == node_id and run["status"] == "running" and rid != run_id:
+                    run["status"] = "interrupted"
+        return run_id, resumed
+
+    def get_completed_group_ids(self, run_id: int) -> set:
+        self._roundtrip()
+        with self.lock:
+            return {gid for (rid, gid), (status, _) in self.run_accounts.items()
+                    if rid == run_id and status in ("success", "skipped")}
+
+    def mark_account_stage(self, run_id: int, group_id: int, stage: str) -> bool:
+        self._roundtrip()
+        with self.lock:
+            self.run_accounts[(run_id, group_id)] = ("running", stage)
+        return True
+
+    def record_account_results(self, run_id: int, results: list) -> bool:
+        self._roundtrip()
+        with self.lock:
+            for group_id, status, detail in results:
+                self.run_accounts[(run_id, group_id)] = (status, detail)
+        return True
+
+    def finish_run(self, run_id: int) -> bool:
+        self._roundtrip()
+        with self.lock:
+            self.runs[run_id].update(status="finished", finished_at=datetime.now())
+        return True
+
+    def fetch_run_history(self, limit: int = 20) -> list:
+        return []
+
+
+def make_groups(count: int, last_video_ts) -> list:
+    return [
+        {
+            "id": i + 1,
+            "tt_link": f"bench_user_{i + 1}",
+            "tt_name": f"Bench {i + 1}",
+            "last_video_id": None,
+            "last_video_ts": last_video_ts,
+            "next_poll_at": None,
+            "poll_interval": None,
+            "post_cadence": None,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "last_crawled_at": None,
+        }
+        for i in range(count)
+    ]
@@ -0,0 +1,153 @@
+import os
+import re
+import time
+import zlib
+import random
+import hashlib
+import threading
+from contextlib import contextmanager
+
+PROFILE_RE = re.compile(r"tiktok\.com/@([^/?#]+)/?$")
+VIDEO_RE = re.compile(r"tiktok\.com/@([^/]+)/video/(\d+)")
+SECUID_PREFIX = "tiktokuser:"
+
+
+class FakeTikTok:
+    # Synthetic TikTok: every account has `videos` posts an hour apart, newest first,
+    # and requests fail with 429 / login errors at the configured rates.
+    def __init__(self, videos: int = 10, base_ts: int = 1_700_000_000, latency: float = 0.05,
+                 media_latency: float = 0.1, throttle_rate: float = 0.0, auth_fail_rate: float = 0.0,
+                 media_bytes: int = 64 * 1024, sounds: int = 0, seed: int = 1):
+        self.videos = videos
+        self.base_ts = base_ts
+        self.latency = latency
+        self.media_latency = media_latency
+        self.throttle_rate = throttle_rate
+        self.auth_fail_rate = auth_fail_rate
+        self.media_bytes = media_bytes
+        self.sounds = sounds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {"profile": 0, "listing": 0, "media": 0, "throttled": 0, "auth_failed": 0}
+
+    def _count(self, kind: str):
+        with self.lock:
+            self.requests[kind] += 1
+
+    def _roll(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def _request(self, kind: str, latency: float):
+        self._count(kind)
+        time.sleep(latency * (0.5 + self._roll()))
+
+        roll = self._roll()
+        if roll < self.throttle_rate:
+            self._count("throttled")
+            raise RuntimeError("ERROR: [TikTok] HTTP Error 429: Too Many Requests")
+        if roll < self.throttle_rate + self.auth_fail_rate:
+            self._count("auth_failed")
+            raise RuntimeError("ERROR: [TikTok] Please log in to view this account")
+
+    def timestamps(self) -> list:
+        return [self.base_ts - i * 3600 for i in range(self.videos)]
+
+    def sound_of(self, username: str, ts: int):
+        # With `sounds` set, every video uses one of that many shared sounds
+        if not self.sounds:
+            return None
+        return int(hashlib.md5(f"{username}{ts}".encode()).hexdigest(), 16) % self.sounds
+
+    def entries(self, username: str):
+        for ts in self.timestamps():
+            # Like real TikTok ids, unique across accounts and carrying the post time
+            video_id = str(ts * 10**9 + zlib.crc32(username.encode()) % 10**9)
+            sound = self.sound_of(username, ts)
+            yield {
+                "id": video_id,
+                "timestamp": ts,
+                "title": f"{username} video {ts}",
+                "url": f"https://www.tiktok.com/@{username}/video/{video_id}",
+                "uploader_id": f"SEC{username}",
+                "track": f"bench sound {sound}" if sound is not None else None,
+                "artists": ["bench"],
+                "duration": 15,
+                "sound": sound,
+            }
+
+    def resolve(self, username: str) -> dict:
+        self._request("profile", self.latency)
+        return {"_type": "playlist", "entries": list(self.entries(username))[:1]}
+
+    def listing(self, target: str) -> dict:
+        self._request("listing", self.latency)
+        if target.startswith(SECUID_PREFIX):
+            username = target[len(SECUID_PREFIX) + 3:]
+        else:
+            username = PROFILE_RE.search(target).group(1)
+        return {"_type": "playlist", "entries": self.entries(username)}
+
+    def download(self, username: str, video_id: str, outtmpl: str, ext: str) -> dict:
+        self._request("media", self.media_latency)
+        path = outtmpl.replace("%(ext)s", ext)
+        sound = self.sound_of(username, int(video_id) // 10**9)
+        seed = f"sound-{sound}" if sound is not None else f"video-{video_id}"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(random.Random(seed).randbytes(self.media_bytes))
+        return {"id": video_id, "ext": ext, "requested_downloads": [{"filepath": path}]}
+
+
+class FakeYoutubeDL:
+    def __init__(self, tiktok: FakeTikTok, params: dict):
+        self.tiktok = tiktok
+        self.params = params
+
+    def extract_info(self, url: str, download: bool = False, process: bool = True) -> dict:
+        video = VIDEO_RE.search(url)
+        if video:
+            ext = "m4a"
+            for pp in self.params.get("postprocessors") or []:
+                if pp.get("preferredcodec") not in (None, "best"):
+                    ext = pp["preferredcodec"]
+            info = self.tiktok.download(video.group(1), video.group(2), self.params["outtmpl"], ext)
+            if self.params.get("postprocessors"):
+                # Like yt-dlp, postprocessors report progress to the hooks
+                for hook in self.params.get("postprocessor_hooks") or []:
+                    hook({"status": "started", "info_dict": info})
+                for hook in self.params.get("postprocessor_hooks") or []:
+                    hook({"status": "finished", "info_dict": info})
+            return info
+
+        if self.params.get("playlistend") == 1 and not url.startswith(SECUID_PREFIX):
+            return self.tiktok.resolve(PROFILE_RE.search(url).group(1))
+
+        info = self.tiktok.listing(url)
+        if process:
+            info["entries"] = list(info["entries"])[:self.params.get("playlistend") or None]
+        return info
+
+    def close(self):
+        pass
+
+
+class FakeYoutubeDLPool:
+    # Drop-in for ydl_pool.ydl_pool
+    def __init__(self, tiktok: FakeTikTok):
+        self.tiktok = tiktok
+        self.created = 0
+
+    @contextmanager
+    def acquire(self, opts: dict, cookies: str = None):
+        self.created += 1
+        yield FakeYoutubeDL(self.tiktok, dict(opts))
+
+    def recycle(self):
+        pass
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"created": self.created, "fake": True}
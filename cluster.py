@@ -0,0 +1,56 @@
+import os
+import socket
+import logging
+import threading
+
+from db import db_adapter as db
+
+DEFAULT_CLUSTER_CONFIG = {
+    "enabled": False,
+    "node_id": "",
+    "lease_seconds": 900,
+    "batch_size": 20,
+    "heartbeat_seconds": 60,
+}
+
+
+def load_cluster_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_CLUSTER_CONFIG)
+    cfg.update(config.get("cluster", {}))
+    # The run journal needs a name that survives a restart, while lease ownership stays
+    # per process so two crawlers on one host never share leases
+    cfg["journal_key"] = cfg["node_id"] or socket.gethostname()
+    if not cfg["node_id"]:
+        cfg["node_id"] = f"{socket.gethostname()}-{os.getpid()}"
+    return cfg
+
+
+class NodeHeartbeat(threading.Thread):
+    def __init__(self, node_id: str, interval: int, lease_seconds: int):
+        super().__init__(name="heartbeat", daemon=True)
+        self.node_id = node_id
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.stop_event = threading.Event()
+
+    def beat(self):
+        try:
+            db.record_heartbeat(self.node_id, socket.gethostname(), "running")
+            renewed = db.renew_leases(self.node_id, self.lease_seconds)
+            logging.debug(f"💓 {self.node_id} renewed {renewed} lease(s)")
+        except Exception as e:
+            logging.warning(f"⚠️ Heartbeat failed for {self.node_id}: {e}")
+
+    def run(self):
+        self.beat()
+        while not self.stop_event.wait(self.interval):
+            self.beat()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=self.interval)
+        try:
+            db.release_leases(self.node_id)
+            db.record_heartbeat(self.node_id, socket.gethostname(), "stopped")
+        except Exception as e:
+            logging.warning(f"⚠️ Could not release leases for {self.node_id}: {e}")
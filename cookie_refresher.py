@@ -1,29 +1,46 @@
 import os
 import time
+import queue
+import atexit
+import bisect
 import logging
+import threading
+import importlib.util
 from datetime import datetime
+from concurrent.futures import Future
 
-try:
-    from playwright.sync_api import sync_playwright
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
+# Playwright is only imported when a browser is actually needed
+PLAYWRIGHT_AVAILABLE = importlib.util.find_spec("playwright") is not None
 
 COOKIES_DIR = "cookies"
 BROWSER_STATE_DIR = "browser_state"
 DEFAULT_COOKIES_FILE = "tiktok_refreshed.txt"
 STATE_FILE = "tiktok_state.json"
+IDENTITIES_DIR = "identities"
 
 LOGIN_TIMEOUT = 120
 HEADLESS_TIMEOUT = 60
+SETTLE_TIMEOUT = 10
+SERVICE_IDLE_SECONDS = 1800
 COOKIE_EXPIRY_THRESHOLD = 0.5
+REFRESH_AHEAD_SECONDS = 6 * 3600
 
 AUTH_COOKIE_NAMES = ["sessionid", "sid_tt", "uid_tt"]
 
 
 def ensure_dirs():
-    os.makedirs(COOKIES_DIR, exist_ok=True)
-    os.makedirs(BROWSER_STATE_DIR, exist_ok=True)
+    os.makedirs(os.path.join(COOKIES_DIR, IDENTITIES_DIR), exist_ok=True)
+    os.makedirs(os.path.join(BROWSER_STATE_DIR, IDENTITIES_DIR), exist_ok=True)
+
+
+def identity_paths(identity: str = None) -> tuple:
+    if not identity:
+        return os.path.join(COOKIES_DIR, DEFAULT_COOKIES_FILE), os.path.join(BROWSER_STATE_DIR, STATE_FILE)
+
+    return (
+        os.path.join(COOKIES_DIR, IDENTITIES_DIR, f"{identity}.txt"),
+        os.path.join(BROWSER_STATE_DIR, IDENTITIES_DIR, f"{identity}.json"),
+    )
 
 
 def cookies_to_netscape(cookies: list) -> str:
@@ -56,21 +73,36 @@ def is_logged_in_by_cookies(cookies: list) -> bool:
 
 def wait_for_auth_cookies(context, timeout: int) -> bool:
     start_time = time.time()
+    last_logged = None
 
     while time.time() - start_time < timeout:
         if is_logged_in_by_cookies(context.cookies()):
             return True
 
         remaining = int(timeout - (time.time() - start_time))
-        if remaining > 0 and remaining % 10 == 0:
+        if remaining > 0 and remaining // 10 != last_logged:
+            last_logged = remaining // 10
             logging.info(f"⏳ Waiting for login... {remaining}s remaining")
 
-        time.sleep(2)
+        # Cookies only change when a response sets them, so wake up on responses
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+        try:
+            context.wait_for_event("response", timeout=max(1, min(remaining, SETTLE_TIMEOUT)) * 1000)
+        except PlaywrightTimeoutError:
+            pass
+
+    return is_logged_in_by_cookies(context.cookies())
+
 
-    return False
+def settle(page):
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    try:
+        page.wait_for_load_state("networkidle", timeout=SETTLE_TIMEOUT * 1000)
+    except PlaywrightTimeoutError:
+        pass
 
 
-def save_cookies(context, state_path: str) -> str:
+def save_cookies(context, state_path: str, identity: str = None) -> str:
     cookies = context.cookies()
     logging.info(f"Got {len(cookies)} cookies")
 
@@ -78,25 +110,32 @@ def save_cookies(context, state_path: str) -> str:
 
     netscape_content = cookies_to_netscape(cookies)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = os.path.join(COOKIES_DIR, f"tiktok_{timestamp}.txt")
+    prefix = f"tiktok_{identity}" if identity else "tiktok"
+    output_file = os.path.join(COOKIES_DIR, f"{prefix}_{timestamp}.txt")
 
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(netscape_content)
 
-    default_file = os.path.join(COOKIES_DIR, DEFAULT_COOKIES_FILE)
-    with open(default_file, "w", encoding="utf-8") as f:
+    # Write then rename, so workers never read a half-written cookie file
+    default_file, _ = identity_paths(identity)
+    tmp_file = f"{default_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
         f.write(netscape_content)
+    os.replace(tmp_file, default_file)
 
     logging.info(f"Cookies saved: {output_file}")
     return default_file
 
 
-def refresh_cookies_playwright(headless: bool = False, timeout: int = LOGIN_TIMEOUT, force_login: bool = False) -> str:
+def refresh_cookies_playwright(headless: bool = False, timeout: int = LOGIN_TIMEOUT, force_login: bool = False,
+                               identity: str = None) -> str:
     if not PLAYWRIGHT_AVAILABLE:
         raise RuntimeError("Playwright not installed")
 
+    from playwright.sync_api import sync_playwright
+
     ensure_dirs()
-    state_path = os.path.join(BROWSER_STATE_DIR, STATE_FILE)
+    _, state_path = identity_paths(identity)
 
     with sync_playwright() as p:
         browser = p.chromium.launch(
@@ -114,7 +153,6 @@ def refresh_cookies_playwright(headless: bool = False, timeout: int = LOGIN_TIME
 
         try:
             page.goto("https://www.tiktok.com/", wait_until="domcontentloaded", timeout=30000)
-            time.sleep(3)
 
             if force_login:
                 logging.info(f"Please login manually within {timeout}s...")
@@ -134,63 +172,242 @@ def refresh_cookies_playwright(headless: bool = False, timeout: int = LOGIN_TIME
                         raise RuntimeError("Login timeout")
 
             logging.info("Login successful - auth cookies found")
-            time.sleep(2)
+            settle(page)
 
-            return save_cookies(context, state_path)
+            return save_cookies(context, state_path, identity)
 
         finally:
             context.close()
             browser.close()
 
 
-def check_cookies_valid(cookies_file: str) -> bool:
-    if not os.path.exists(cookies_file):
-        return False
+class CookieState:
+    # Parsed view of a Netscape cookie file, re-read only when its mtime changes
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.expiries = []
+        self.auth_expiry = None
 
-    try:
-        with open(cookies_file, "r", encoding="utf-8") as f:
-            content = f.read()
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self.lock:
+            if mtime == self.mtime:
+                return
+            self.mtime = mtime
+            self.expiries = []
+            self.auth_expiry = None
+            if mtime is None:
+                return
+
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    content = f.read()
+            except OSError:
+                return
+
+            for line in content.split("\n"):
+                if line.startswith("#") or not line.strip():
+                    continue
+
+                parts = line.split("\t")
+                if len(parts) < 7:
+                    continue
+                try:
+                    expiry = int(parts[4])
+                except ValueError:
+                    continue
+
+                self.expiries.append(expiry)
+                if parts[5] in AUTH_COOKIE_NAMES:
+                    self.auth_expiry = expiry if self.auth_expiry is None else min(self.auth_expiry, expiry)
+
+            self.expiries.sort()
+
+    def is_valid(self) -> bool:
+        self._reload()
+        with self.lock:
+            if not self.expiries:
+                return False
+            expired_count = bisect.bisect_left(self.expiries, time.time())
+            return (expired_count / len(self.expiries)) <= COOKIE_EXPIRY_THRESHOLD
 
-        current_time = time.time()
-        expired_count = 0
-        total_count = 0
+    def seconds_left(self) -> float:
+        self._reload()
+        with self.lock:
+            if self.auth_expiry is None:
+                return 0.0
+            return self.auth_expiry - time.time()
 
-        for line in content.split("\n"):
-            if line.startswith("#") or not line.strip():
-                continue
+    def needs_refresh(self, ahead: int = REFRESH_AHEAD_SECONDS) -> bool:
+        return self.seconds_left() < ahead
 
-            parts = line.split("\t")
-            if len(parts) >= 7:
-                total_count += 1
-                if int(parts[4]) < current_time:
-                    expired_count += 1
 
-        if total_count == 0:
-            return False
+_cookie_states = {}
+_cookie_states_lock = threading.Lock()
 
-        return (expired_count / total_count) <= COOKIE_EXPIRY_THRESHOLD
 
-    except Exception:
-        return False
+def cookie_state(cookies_file: str) -> CookieState:
+    with _cookie_states_lock:
+        state = _cookie_states.get(cookies_file)
+        if state is None:
+            state = _cookie_states[cookies_file] = CookieState(cookies_file)
+        return state
 
 
-def auto_refresh_if_needed(force: bool = False) -> str:
-    default_file = os.path.join(COOKIES_DIR, DEFAULT_COOKIES_FILE)
+def check_cookies_valid(cookies_file: str) -> bool:
+    return cookie_state(cookies_file).is_valid()
+
+
+class CookieRefreshService:
+    # Owns one headless Chromium on a dedicated thread (Playwright's sync API is
+    # thread-bound) and keeps a warm context per identity between refreshes.
+    def __init__(self, idle_seconds: int = SERVICE_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()
+        self.pending = {}
+        self.thread = None
+
+    def refresh(self, identity: str = None) -> Future:
+        with self.lock:
+            future = self.pending.get(identity)
+            if future is not None:
+                return future
+
+            future = self.pending[identity] = Future()
+            self.requests.put(identity)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="cookie-service", daemon=True)
+                self.thread.start()
+            return future
+
+    def stop(self):
+        with self.lock:
+            thread = self.thread
+        if thread is not None and thread.is_alive():
+            self.requests.put(False)
+            thread.join(timeout=SETTLE_TIMEOUT)
+
+    def _run(self):
+        error = None
+        try:
+            self._serve()
+        except Exception as e:
+            error = e
+            logging.error(f"❌ Cookie refresh service stopped: {e}")
+        finally:
+            # A crashed service must not leave callers waiting on futures nobody will resolve
+            with self.lock:
+                stranded = {}
+                if self.thread is threading.current_thread():
+                    self.thread = None
+                    stranded, self.pending = self.pending, {}
+                    while not self.requests.empty():
+                        self.requests.get_nowait()
+            for future in stranded.values():
+                future.set_exception(error or RuntimeError("Cookie refresh service stopped"))
+
+    def _serve(self):
+        from playwright.sync_api import sync_playwright
+
+        contexts = {}
+        with sync_playwright() as p:
+            browser = p.chromium.launch(
+                headless=True,
+                args=["--disable-blink-features=AutomationControlled", "--no-sandbox"]
+            )
+            try:
+                while True:
+                    try:
+                        identity = self.requests.get(timeout=self.idle_seconds)
+                    except queue.Empty:
+                        identity = False
+                    if identity is False:
+                        with self.lock:
+                            if self.requests.empty():
+                                self.thread = None
+                                return
+                        continue
+
+                    with self.lock:
+                        future = self.pending.get(identity)
+                    if future is None:
+                        continue
+                    try:
+                        result = self._refresh(browser, contexts, identity)
+                    except Exception as e:
+                        context = contexts.pop(identity, None)
+                        if context is not None:
+                            context.close()
+                        result, error = None, e
+                    else:
+                        error = None
+
+                    with self.lock:
+                        self.pending.pop(identity, None)
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+            finally:
+                for context in contexts.values():
+                    context.close()
+                browser.close()
+
+    def _refresh(self, browser, contexts: dict, identity: str) -> str:
+        _, state_path = identity_paths(identity)
+        started = time.monotonic()
+
+        context = contexts.get(identity)
+        if context is None:
+            if not os.path.exists(state_path):
+                raise RuntimeError(f"No saved session for {identity or 'default'}, run --login first")
+            context = contexts[identity] = browser.new_context(
+                storage_state=state_path, viewport={"width": 1280, "height": 720}
+            )
+
+        page = context.pages[0] if context.pages else context.new_page()
+        page.goto("https://www.tiktok.com/", wait_until="domcontentloaded", timeout=30000)
+        if not wait_for_auth_cookies(context, HEADLESS_TIMEOUT):
+            raise RuntimeError("Saved session is logged out")
+        settle(page)
+
+        path = save_cookies(context, state_path, identity)
+        logging.info(f"Headless refresh took {time.monotonic() - started:.1f}s")
+        return path
+
+
+refresh_service = CookieRefreshService()
+atexit.register(refresh_service.stop)
+
+
+def auto_refresh_if_needed(force: bool = False, identity: str = None, interactive: bool = True) -> str:
+    default_file, state_path = identity_paths(identity)
 
     if not force and check_cookies_valid(default_file):
         logging.info("Cookies still valid")
         return default_file
 
-    logging.info("Cookies need refresh...")
+    logging.info(f"Cookies need refresh{f' for {identity}' if identity else ''}...")
 
-    state_path = os.path.join(BROWSER_STATE_DIR, STATE_FILE)
     if os.path.exists(state_path):
         try:
-            return refresh_cookies_playwright(headless=True, timeout=HEADLESS_TIMEOUT)
+            return refresh_service.refresh(identity).result(timeout=HEADLESS_TIMEOUT + 60)
         except Exception as e:
             logging.warning(f"Headless refresh failed: {e}")
+            if not interactive:
+                raise
+
+    if not interactive:
+        raise RuntimeError(f"No saved session for {identity or 'default'}, run --login first")
 
-    return refresh_cookies_playwright(headless=False, timeout=LOGIN_TIMEOUT)
+    return refresh_cookies_playwright(headless=False, timeout=LOGIN_TIMEOUT, identity=identity)
 
 
 if __name__ == "__main__":
@@ -206,7 +423,11 @@ if __name__ == "__main__":
         print("Playwright required: pip install playwright && playwright install chromium")
         sys.exit(1)
 
+    identity = None
+    if "--identity" in sys.argv:
+        identity = sys.argv[sys.argv.index("--identity") + 1]
+
     if "--login" in sys.argv:
-        refresh_cookies_playwright(headless=False, timeout=300, force_login=True)
+        refresh_cookies_playwright(headless=False, timeout=300, force_login=True, identity=identity)
     else:
-        auto_refresh_if_needed(force="--force" in sys.argv)
+        auto_refresh_if_needed(force="--force" in sys.argv, identity=identity)
@@ -1,5 +1,13 @@
 import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import errors as pg_errors
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import RealDictCursor, execute_values
 
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "localhost"),
@@ -9,6 +17,16 @@ DB_CONFIG = {
     "port": int(os.getenv("DB_PORT", 5432))
 }
 
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+HEALTH_CHECK_INTERVAL = 30
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(max(DB_POOL_MAX, 1))
+_last_used = {}
+_schema_ready = False
+
 
 def get_connection():
     try:
@@ -18,25 +36,266 @@ def get_connection():
         return None
 
 
-def validate_yt_post(title: str, url: str) -> bool:
-    conn = get_connection()
-    if not conn:
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pg_pool.ThreadedConnectionPool(
+                    max(DB_POOL_MIN, 0), max(DB_POOL_MAX, 1), **DB_CONFIG
+                )
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
+
+
+atexit.register(close_pool)
+
+
+def _is_healthy(conn) -> bool:
+    if conn.closed:
         return False
 
+    # Only ping connections that sat idle long enough to have been dropped
+    if time.time() - _last_used.get(id(conn), 0) < HEALTH_CHECK_INTERVAL:
+        return True
+
     try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout(db_pool):
+    for _ in range(2):
+        conn = db_pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        _last_used.pop(id(conn), None)
+        db_pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("No healthy connection available in pool")
+
+
+@contextmanager
+def connection():
+    _pool_slots.acquire()
+    db_pool = None
+    conn = None
+    broken = False
+
+    try:
+        try:
+            db_pool = get_pool()
+            conn = _checkout(db_pool)
+        except Exception as e:
+            print(f"DB connection error: {e}")
+
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+    finally:
+        if conn is not None:
+            if broken or conn.closed:
+                _last_used.pop(id(conn), None)
+            else:
+                _last_used[id(conn)] = time.time()
+            db_pool.putconn(conn, close=broken or bool(conn.closed))
+        _pool_slots.release()
+
+
+GROUP_COLUMNS = """
+    id, tt_link, tt_name, last_video_id, last_video_ts,
+    next_poll_at, poll_interval, post_cadence
+"""
+
+
+def fetch_groups() -> list:
+    with connection() as conn:
+        if not conn:
+            return []
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(f"SELECT {GROUP_COLUMNS} FROM tt_group ORDER BY id")
+            return cur.fetchall()
+
+
+def fetch_due_groups(slack_seconds: int = 0) -> list:
+    with connection() as conn:
+        if not conn:
+            return []
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(f"""
+                SELECT {GROUP_COLUMNS} FROM tt_group
+                WHERE next_poll_at IS NULL
+                   OR next_poll_at <= NOW() + %s * INTERVAL '1 second'
+                ORDER BY next_poll_at NULLS FIRST, id
+            """, (slack_seconds,))
+            return cur.fetchall()
+
+
+def current_timestamp():
+    with connection() as conn:
+        if not conn:
+            return None
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT LOCALTIMESTAMP")
+            return cur.fetchone()[0]
+
+
+def lease_groups(node_id: str, limit: int, lease_seconds: int, due_only: bool = True,
+                 slack_seconds: int = 0, exclude_ids: list = None, crawled_since=None) -> list:
+    with connection() as conn:
+        if not conn:
+            return []
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            # SKIP LOCKED lets concurrent nodes claim disjoint batches without waiting on each other
+            cur.execute(f"""
+                UPDATE tt_group
+                SET lease_owner = %s, lease_expires_at = NOW() + %s * INTERVAL '1 second'
+                WHERE id IN (
+                    SELECT id FROM tt_group
+                    WHERE (lease_expires_at IS NULL OR lease_expires_at < NOW() OR lease_owner = %s)
+                      AND (NOT %s OR next_poll_at IS NULL
+                           OR next_poll_at <= NOW() + %s * INTERVAL '1 second')
+                      AND id <> ALL(%s)
+                      AND (%s::TIMESTAMP IS NULL OR last_crawled_at IS NULL OR last_crawled_at < %s)
+                    ORDER BY next_poll_at NULLS FIRST, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {GROUP_COLUMNS}
+            """, (node_id, lease_seconds, node_id, due_only, slack_seconds, list(exclude_ids or []),
+                  crawled_since, crawled_since, limit))
+            rows = cur.fetchall()
+            conn.commit()
+            return sorted(rows, key=lambda r: r["id"])
+
+
+def renew_leases(node_id: str, lease_seconds: int) -> int:
+    with connection() as conn:
+        if not conn:
+            return 0
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE tt_group SET lease_expires_at = NOW() + %s * INTERVAL '1 second'
+                WHERE lease_owner = %s
+            """, (lease_seconds, node_id))
+            conn.commit()
+            return cur.rowcount
+
+
+def release_leases(node_id: str, group_ids: list = None, crawled: bool = False) -> bool:
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            if group_ids is None:
+                cur.execute("""
+                    UPDATE tt_group SET lease_owner = NULL, lease_expires_at = NULL
+                    WHERE lease_owner = %s
+                """, (node_id,))
+            else:
+                cur.execute("""
+                    UPDATE tt_group
+                    SET lease_owner = NULL, lease_expires_at = NULL,
+                        last_crawled_at = CASE WHEN %s THEN LOCALTIMESTAMP ELSE last_crawled_at END
+                    WHERE lease_owner = %s AND id = ANY(%s)
+                """, (crawled, node_id, list(group_ids)))
+            conn.commit()
+            return True
+
+
+def record_heartbeat(node_id: str, hostname: str, status: str) -> bool:
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO crawler_nodes (node_id, hostname, status, started_at, last_heartbeat)
+                VALUES (%s, %s, %s, NOW(), NOW())
+                ON CONFLICT (node_id) DO UPDATE
+                SET hostname = EXCLUDED.hostname, status = EXCLUDED.status,
+                    last_heartbeat = EXCLUDED.last_heartbeat
+            """, (node_id, hostname, status))
+            conn.commit()
+            return True
+
+
+def update_poll_schedules(updates: list) -> bool:
+    if not updates:
+        return True
+
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                UPDATE tt_group AS g
+                SET poll_interval = v.poll_interval,
+                    post_cadence = v.post_cadence,
+                    last_polled_at = NOW(),
+                    next_poll_at = NOW() + v.poll_interval * INTERVAL '1 second'
+                FROM (VALUES %s) AS v (id, poll_interval, post_cadence)
+                WHERE g.id = v.id
+            """, updates, template="(%s, %s::INTEGER, %s::INTEGER)")
+            conn.commit()
+            return True
+
+
+def update_watermarks(updates: list) -> bool:
+    if not updates:
+        return True
+
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                UPDATE tt_group AS g
+                SET last_video_id = v.video_id, last_video_ts = v.video_ts
+                FROM (VALUES %s) AS v (id, video_id, video_ts)
+                WHERE g.id = v.id
+                  AND (g.last_video_ts IS NULL OR v.video_ts > g.last_video_ts)
+            """, updates)
+            conn.commit()
+            return True
+
+
+def validate_yt_post(title: str, url: str) -> bool:
+    with connection() as conn:
+        if not conn:
+            return False
+
         with conn.cursor() as cur:
             cur.execute("SELECT 1 FROM yt_post WHERE url = %s", (url,))
             return cur.fetchone() is None
-    finally:
-        conn.close()
 
 
 def insert_yt_post(video_id: str, title: str, url: str, audio_path: str) -> bool:
-    conn = get_connection()
-    if not conn:
-        return False
+    with connection() as conn:
+        if not conn:
+            return False
 
-    try:
         with conn.cursor() as cur:
             cur.execute("""
                 INSERT INTO yt_post (video_id, title, url, audio_path)
@@ -45,5 +304,411 @@ def insert_yt_post(video_id: str, title: str, url: str, audio_path: str) -> bool
             """, (video_id, title, url, audio_path))
             conn.commit()
             return True
-    finally:
-        conn.close()
+
+
+def get_known_urls(urls: list) -> set:
+    if not urls:
+        return set()
+
+    with connection() as conn:
+        if not conn:
+            return set()
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT url FROM yt_post WHERE url = ANY(%s)", (list(urls),))
+            return {row[0] for row in cur.fetchall()}
+
+
+def insert_yt_posts(rows: list) -> bool:
+    if not rows:
+        return True
+
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO yt_post (video_id, title, url, audio_path, audio_sha256)
+                VALUES %s
+                ON CONFLICT (url) DO NOTHING
+            """, rows)
+            conn.commit()
+            return True
+
+
+def fetch_posts_without_mp3(limit: int, after_id: int = 0, exclude_prefix: str = "", max_failures: int = 3) -> list:
+    with connection() as conn:
+        if not conn:
+            return []
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, audio_path FROM yt_post
+                WHERE audio_path IS NOT NULL AND audio_path NOT ILIKE '%%.mp3'
+                  AND (%s = '' OR left(audio_path, char_length(%s)) <> %s)
+                  AND mp3_failures < %s
+                  AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (exclude_prefix, exclude_prefix, exclude_prefix, max_failures, after_id, limit))
+            return cur.fetchall()
+
+
+def record_mp3_failures(paths: list, permanent: bool = False) -> bool:
+    if not paths:
+        return True
+
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE yt_post
+                SET mp3_failures = CASE WHEN %s THEN 32767 ELSE mp3_failures + 1 END
+                WHERE audio_path = ANY(%s)
+            """, (permanent, list(paths)))
+            conn.commit()
+            return True
+
+
+def update_audio_paths(updates: list) -> bool:
+    if not updates:
+        return True
+
+    # Keyed on the old path, since a shared blob is referenced by several posts
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                UPDATE yt_post AS p
+                SET audio_path = v.new_path
+                FROM (VALUES %s) AS v (old_path, new_path)
+                WHERE p.audio_path = v.old_path
+            """, updates)
+            execute_values(cur, """
+                UPDATE audio_blobs AS b
+                SET path = v.new_path
+                FROM (VALUES %s) AS v (old_path, new_path)
+                WHERE b.path = v.old_path
+            """, updates)
+            conn.commit()
+            return True
+
+
+def forget_audio_paths(paths: list) -> bool:
+    if not paths:
+        return True
+
+    # Posts keep audio_sha256, so the content they pointed at is still known
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("UPDATE yt_post SET audio_path = NULL WHERE audio_path = ANY(%s)", (list(paths),))
+            cur.execute("DELETE FROM audio_blobs WHERE path = ANY(%s)", (list(paths),))
+            conn.commit()
+            return True
+
+
+def get_blob_path(sha256: str):
+    with connection() as conn:
+        if not conn:
+            return None
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT path FROM audio_blobs WHERE sha256 = %s", (sha256,))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+
+def save_audio_blob(sha256: str, path: str, size: int) -> bool:
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO audio_blobs (sha256, path, size)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (sha256) DO UPDATE SET path = EXCLUDED.path, size = EXCLUDED.size
+            """, (sha256, path, size))
+            conn.commit()
+            return True
+
+
+# Bump whenever SCHEMA_STATEMENTS changes, so existing databases get migrated once
+SCHEMA_VERSION = 1
+
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS tt_secuid_cache (
+        username VARCHAR(255) PRIMARY KEY,
+        sec_uid VARCHAR(255) NOT NULL,
+        resolved_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS last_video_id VARCHAR(64)",
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS last_video_ts BIGINT",
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS next_poll_at TIMESTAMP",
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS last_polled_at TIMESTAMP",
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS poll_interval INTEGER",
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS post_cadence INTEGER",
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(128)",
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP",
+    "ALTER TABLE tt_group ADD COLUMN IF NOT EXISTS last_crawled_at TIMESTAMP",
+    """
+    CREATE TABLE IF NOT EXISTS crawler_nodes (
+        node_id VARCHAR(128) PRIMARY KEY,
+        hostname VARCHAR(255),
+        status VARCHAR(32),
+        started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        last_heartbeat TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS crawl_runs (
+        id SERIAL PRIMARY KEY,
+        node_id VARCHAR(128) NOT NULL,
+        status VARCHAR(16) NOT NULL DEFAULT 'running',
+        started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP,
+        success INTEGER,
+        skipped INTEGER,
+        failed INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS crawl_run_accounts (
+        run_id INTEGER NOT NULL REFERENCES crawl_runs (id) ON DELETE CASCADE,
+        group_id INTEGER NOT NULL,
+        stage VARCHAR(16) NOT NULL,
+        status VARCHAR(16) NOT NULL DEFAULT 'running',
+        detail TEXT,
+        started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP,
+        PRIMARY KEY (run_id, group_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS crawl_runs_node_idx ON crawl_runs (node_id, status)",
+    """
+    CREATE TABLE IF NOT EXISTS audio_blobs (
+        sha256 CHAR(64) PRIMARY KEY,
+        path VARCHAR(500) NOT NULL,
+        size BIGINT,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "ALTER TABLE yt_post ADD COLUMN IF NOT EXISTS audio_sha256 CHAR(64)",
+    "ALTER TABLE yt_post ADD COLUMN IF NOT EXISTS mp3_failures SMALLINT NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS yt_post_audio_path_idx ON yt_post (audio_path)",
+    """
+    CREATE TABLE IF NOT EXISTS crawler_schema (
+        version INTEGER PRIMARY KEY,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def _schema_version(conn) -> int:
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MAX(version) FROM crawler_schema")
+            row = cur.fetchone()
+        conn.rollback()
+        return row[0] or 0
+    except pg_errors.UndefinedTable:
+        conn.rollback()
+        return 0
+
+
+def ensure_schema() -> bool:
+    global _schema_ready
+    # The scheduler calls main() repeatedly; the DDL only needs to run once per process
+    if _schema_ready:
+        return True
+
+    with connection() as conn:
+        if not conn:
+            return False
+
+        # A normal start only reads the version; the DDL runs when the database is behind
+        if _schema_version(conn) < SCHEMA_VERSION:
+            with conn.cursor() as cur:
+                for statement in SCHEMA_STATEMENTS:
+                    cur.execute(statement)
+                cur.execute("""
+                    INSERT INTO crawler_schema (version) VALUES (%s)
+                    ON CONFLICT (version) DO NOTHING
+                """, (SCHEMA_VERSION,))
+            conn.commit()
+
+        _schema_ready = True
+        return True
+
+
+def get_cached_sec_uid(username: str, max_age_seconds: int):
+    with connection() as conn:
+        if not conn:
+            return None
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT sec_uid FROM tt_secuid_cache
+                WHERE username = %s
+                  AND resolved_at > NOW() - %s * INTERVAL '1 second'
+            """, (username, max_age_seconds))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+
+def save_sec_uid(username: str, sec_uid: str) -> bool:
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO tt_secuid_cache (username, sec_uid, resolved_at)
+                VALUES (%s, %s, NOW())
+                ON CONFLICT (username) DO UPDATE
+                SET sec_uid = EXCLUDED.sec_uid, resolved_at = EXCLUDED.resolved_at
+            """, (username, sec_uid))
+            conn.commit()
+            return True
+
+
+def invalidate_sec_uid(username: str) -> bool:
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM tt_secuid_cache WHERE username = %s", (username,))
+            conn.commit()
+            return True
+
+
+def open_run(node_id: str, resume_window_seconds: int) -> tuple:
+    with connection() as conn:
+        if not conn:
+            return None, False
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id FROM crawl_runs
+                WHERE node_id = %s AND status = 'running'
+                  AND started_at > NOW() - %s * INTERVAL '1 second'
+                ORDER BY id DESC LIMIT 1
+            """, (node_id, resume_window_seconds))
+            row = cur.fetchone()
+            resumed = row is not None
+
+            if resumed:
+                run_id = row[0]
+            else:
+                cur.execute("""
+                    INSERT INTO crawl_runs (node_id) VALUES (%s) RETURNING id
+                """, (node_id,))
+                run_id = cur.fetchone()[0]
+
+            cur.execute("""
+                UPDATE crawl_runs SET status = 'interrupted'
+                WHERE node_id = %s AND status = 'running' AND id <> %s
+            """, (node_id, run_id))
+            conn.commit()
+            return run_id, resumed
+
+
+def get_completed_group_ids(run_id: int) -> set:
+    with connection() as conn:
+        if not conn:
+            return set()
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT group_id FROM crawl_run_accounts
+                WHERE run_id = %s AND status IN ('success', 'skipped')
+            """, (run_id,))
+            return {row[0] for row in cur.fetchall()}
+
+
+def mark_account_stage(run_id: int, group_id: int, stage: str) -> bool:
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO crawl_run_accounts (run_id, group_id, stage)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (run_id, group_id) DO UPDATE
+                SET stage = EXCLUDED.stage, status = 'running', finished_at = NULL
+            """, (run_id, group_id, stage))
+            conn.commit()
+            return True
+
+
+def record_account_results(run_id: int, results: list) -> bool:
+    if not results:
+        return True
+
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO crawl_run_accounts (run_id, group_id, stage, status, detail, finished_at)
+                VALUES %s
+                ON CONFLICT (run_id, group_id) DO UPDATE
+                SET stage = EXCLUDED.stage, status = EXCLUDED.status,
+                    detail = EXCLUDED.detail, finished_at = EXCLUDED.finished_at
+            """, [(run_id, group_id, "done", status, detail) for group_id, status, detail in results],
+                template="(%s, %s, %s, %s, %s, NOW())")
+            conn.commit()
+            return True
+
+
+def finish_run(run_id: int) -> bool:
+    with connection() as conn:
+        if not conn:
+            return False
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE crawl_runs r
+                SET status = 'finished', finished_at = NOW(),
+                    success = c.success, skipped = c.skipped, failed = c.failed
+                FROM (
+                    SELECT COUNT(*) FILTER (WHERE status = 'success') AS success,
+                           COUNT(*) FILTER (WHERE status = 'skipped') AS skipped,
+                           COUNT(*) FILTER (WHERE status NOT IN ('success', 'skipped')) AS failed
+                    FROM crawl_run_accounts WHERE run_id = %s
+                ) c
+                WHERE r.id = %s
+            """, (run_id, run_id))
+            conn.commit()
+            return True
+
+
+def fetch_run_history(limit: int = 20) -> list:
+    with connection() as conn:
+        if not conn:
+            return []
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT id, node_id, status, started_at, finished_at,
+                       EXTRACT(EPOCH FROM COALESCE(finished_at, NOW()) - started_at)::INTEGER AS duration,
+                       success, skipped, failed
+                FROM crawl_runs
+                ORDER BY id DESC
+                LIMIT %s
+            """, (limit,))
+            return cur.fetchall()
@@ -0,0 +1,178 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from metrics import metrics
+from rate_limiter import RateLimiter
+from cookie_refresher import PLAYWRIGHT_AVAILABLE, auto_refresh_if_needed, cookie_state, identity_paths
+
+DEFAULT_IDENTITY_CONFIG = {
+    "enabled": False,
+    "names": [],
+    "auth_errors_before_quarantine": 2,
+    "quarantine_seconds": 1800,
+    "refresh_retry_seconds": 900,
+    "rate_limits": {},
+}
+
+
+class NoIdentityAvailable(RuntimeError):
+    pass
+
+
+def load_identity_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_IDENTITY_CONFIG)
+    cfg.update(config.get("identities", {}))
+    return cfg
+
+
+class Identity:
+    def __init__(self, name: str, rate_limits: dict):
+        self.name = name
+        self.cookies_file, self.state_path = identity_paths(name)
+        self.limiter = RateLimiter(rate_limits, scope=name)
+        self.in_flight = 0
+        self.requests = 0
+        self.auth_errors = 0
+        self.quarantined_until = 0.0
+        self.refreshing = False
+        self.next_refresh_at = 0.0
+
+    def is_available(self, kind: str, now: float) -> bool:
+        return (
+            self.quarantined_until <= now
+            and cookie_state(self.cookies_file).is_valid()
+            and self.limiter.breakers[kind].accepts_requests()
+        )
+
+
+class IdentityPool:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.identities = []
+        self.enabled = False
+        self.cfg = dict(DEFAULT_IDENTITY_CONFIG)
+        self.is_auth_error = lambda error_str: False
+        self.on_refreshed = None
+
+    def configure(self, cfg: dict, is_auth_error, on_refreshed=None):
+        with self.lock:
+            self.cfg = cfg
+            self.enabled = bool(cfg["enabled"] and cfg["names"])
+            self.is_auth_error = is_auth_error
+            self.on_refreshed = on_refreshed
+
+            existing = {i.name: i for i in self.identities}
+            self.identities = []
+            for name in cfg["names"]:
+                identity = existing.get(name) or Identity(name, cfg["rate_limits"])
+                identity.limiter.configure(cfg["rate_limits"])
+                self.identities.append(identity)
+
+        if self.enabled:
+            logging.info(f"🪪 Identity pool: {', '.join(cfg['names'])}")
+
+    def _pick(self, kind: str) -> Identity:
+        now = time.time()
+        with self.lock:
+            available = [i for i in self.identities if i.is_available(kind, now)]
+            if not available:
+                raise NoIdentityAvailable("All TikTok identities are quarantined or throttled")
+
+            # Least busy first, then the one that has served the fewest requests
+            identity = min(available, key=lambda i: (i.in_flight, i.requests))
+            identity.in_flight += 1
+            identity.requests += 1
+
+        if cookie_state(identity.cookies_file).needs_refresh():
+            self._start_refresh(identity)
+        return identity
+
+    @contextmanager
+    def request(self, kind: str):
+        if not self.enabled:
+            yield None
+            return
+
+        identity = self._pick(kind)
+        try:
+            with identity.limiter.request(kind):
+                yield identity.cookies_file
+        except Exception as e:
+            self._release(identity, e)
+            raise
+        else:
+            self._release(identity, None)
+
+    def _release(self, identity: Identity, error):
+        quarantine = False
+        with self.lock:
+            identity.in_flight -= 1
+            if error is None:
+                identity.auth_errors = 0
+            elif self.is_auth_error(str(error)):
+                identity.auth_errors += 1
+                quarantine = identity.auth_errors >= self.cfg["auth_errors_before_quarantine"]
+
+        if quarantine:
+            self.quarantine(identity)
+
+    def quarantine(self, identity: Identity):
+        with self.lock:
+            identity.quarantined_until = time.time() + self.cfg["quarantine_seconds"]
+            identity.auth_errors = 0
+            identity.next_refresh_at = 0.0
+
+        logging.warning(
+            f"🚧 Identity {identity.name} quarantined for {self.cfg['quarantine_seconds'] // 60} minutes"
+        )
+        self._start_refresh(identity)
+
+    def _start_refresh(self, identity: Identity):
+        if not PLAYWRIGHT_AVAILABLE:
+            return
+
+        with self.lock:
+            if identity.refreshing or time.time() < identity.next_refresh_at:
+                return
+            identity.refreshing = True
+            identity.next_refresh_at = time.time() + self.cfg["refresh_retry_seconds"]
+
+        threading.Thread(
+            target=self._refresh, args=(identity,), name=f"refresh-{identity.name}", daemon=True
+        ).start()
+
+    def _refresh(self, identity: Identity):
+        try:
+            auto_refresh_if_needed(force=True, identity=identity.name, interactive=False)
+        except Exception as e:
+            metrics.inc("cookie_refreshes_total", result="failed", identity=identity.name)
+            logging.warning(f"⚠️ Could not refresh identity {identity.name}: {e}")
+            return
+        finally:
+            with self.lock:
+                identity.refreshing = False
+
+        with self.lock:
+            identity.quarantined_until = 0.0
+        metrics.inc("cookie_refreshes_total", result="ok", identity=identity.name)
+        logging.info(f"✅ Identity {identity.name} refreshed and back in rotation")
+        if self.on_refreshed:
+            self.on_refreshed()
+
+    def has_available(self) -> bool:
+        now = time.time()
+        with self.lock:
+            return any(
+                i.quarantined_until <= now and cookie_state(i.cookies_file).is_valid() for i in self.identities
+            )
+
+    def summary(self) -> str:
+        now = time.time()
+        with self.lock:
+            parts = []
+            for i in self.identities:
+                flag = " (quarantined)" if i.quarantined_until > now else ""
+                parts.append(f"{i.name}={i.requests}{flag}")
+            return ", ".join(parts)
@@ -0,0 +1,166 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+DEFAULT_METRICS_CONFIG = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 9108,
+}
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+METRIC_HELP = {
+    "crawl_stage_seconds": ("histogram", "Time spent per crawl stage"),
+    "rate_limit_wait_seconds": ("histogram", "Time spent waiting for a rate limit token"),
+    "crawl_accounts_total": ("counter", "Accounts processed by result"),
+    "crawl_failures_total": ("counter", "Failed accounts by error category"),
+    "tiktok_throttled_total": ("counter", "Requests answered with HTTP 429"),
+    "cookie_refreshes_total": ("counter", "Cookie refresh attempts by result"),
+    "download_bytes_total": ("counter", "Bytes of media downloaded"),
+    "posts_saved_total": ("counter", "Posts written to yt_post"),
+    "audio_evictions_total": ("counter", "Stored audio files archived or deleted by retention"),
+}
+
+
+def load_metrics_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_METRICS_CONFIG)
+    cfg.update(config.get("metrics", {}))
+    return cfg
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.local = threading.local()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _labels_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def _spans(self) -> list:
+        if not hasattr(self.local, "spans"):
+            self.local.spans = []
+        return self.local.spans
+
+    def begin(self, stage: str):
+        self._spans().append([stage, time.monotonic(), 0.0])
+
+    def end(self, stage: str):
+        # Stages are exclusive: time spent in an inner span on this thread is not counted
+        # again by the outer one. Inner spans left open (a hook that never finished) close too.
+        spans = self._spans()
+        if not any(span[0] == stage for span in spans):
+            return
+
+        now = time.monotonic()
+        while spans:
+            name, started, inner = spans.pop()
+            elapsed = now - started
+            self.observe("crawl_stage_seconds", elapsed - inner, stage=name)
+            if spans:
+                spans[-1][2] += elapsed
+            if name == stage:
+                return
+
+    @contextmanager
+    def span(self, stage: str):
+        self.begin(stage)
+        try:
+            yield
+        finally:
+            self.end(stage)
+
+    def stage_totals(self) -> dict:
+        with self.lock:
+            series = self.histograms.get("crawl_stage_seconds", {})
+            return {dict(key)["stage"]: (h["count"], h["sum"]) for key, h in series.items()}
+
+    def summary(self) -> str:
+        totals = sorted(self.stage_totals().items(), key=lambda item: -item[1][1])
+        return ", ".join(f"{stage}={total:.1f}s/{count}" for stage, (count, total) in totals)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for name in sorted(set(self.counters) | set(self.histograms)):
+                kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+                for key, value in sorted(self.counters.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+                for key, hist in sorted(self.histograms.get(name, {}).items()):
+                    for bound, count in zip(BUCKETS, hist["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', str(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {hist['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist['sum']:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def start_metrics_server(cfg: dict):
+    if not cfg["enabled"]:
+        return None
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((cfg["host"], int(cfg["port"])), MetricsHandler)
+    except OSError as e:
+        logging.warning(f"⚠️ Could not start metrics endpoint on {cfg['host']}:{cfg['port']}: {e}")
+        return None
+
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"📈 Metrics on http://{cfg['host']}:{cfg['port']}/metrics")
+    return server
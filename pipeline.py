@@ -0,0 +1,190 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+from metrics import metrics
+
+DEFAULT_PIPELINE_CONFIG = {
+    "enabled": False,
+    "discovery_workers": 2,
+    "download_workers": 2,
+    "transcode_workers": 0,
+    "queue_size": 20,
+    "report_interval_seconds": 30,
+}
+
+_DONE = object()
+
+
+def load_pipeline_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_PIPELINE_CONFIG)
+    cfg.update(config.get("pipeline", {}))
+    if not cfg["transcode_workers"]:
+        cfg["transcode_workers"] = os.cpu_count() or 1
+    return cfg
+
+
+class StagedPipeline:
+    # discover(group) -> jobs, dedup([(group, jobs), ...]) -> jobs filters everything
+    # discovered so far in one go, download(job) -> job, transcode(path) -> path runs in a
+    # process pool, commit(job) persists the result, on_error(stage, item, error).
+    def __init__(self, cfg: dict, discover, download, transcode, commit, on_error, dedup=None):
+        self.cfg = cfg
+        self.discover = discover
+        self.dedup = dedup
+        self.download = download
+        self.transcode = transcode
+        self.commit = commit
+        self.on_error = on_error
+
+        size = max(1, int(cfg["queue_size"]))
+        self.groups_q = queue.Queue()
+        self.dedup_q = queue.Queue()
+        self.download_q = queue.Queue(maxsize=size)
+        self.transcode_q = queue.Queue(maxsize=size)
+        self.commit_q = queue.Queue(maxsize=size)
+        self.processed = {"discover": 0, "dedup": 0, "download": 0, "transcode": 0, "commit": 0}
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def depths(self) -> dict:
+        return {
+            "discover": self.groups_q.qsize(),
+            "dedup": self.dedup_q.qsize(),
+            "download": self.download_q.qsize(),
+            "transcode": self.transcode_q.qsize(),
+            "commit": self.commit_q.qsize(),
+        }
+
+    def log_depths(self):
+        depths = " ".join(f"{k}={v}" for k, v in self.depths().items())
+        with self.lock:
+            done = " ".join(f"{k}={v}" for k, v in self.processed.items())
+        logging.info(f"📦 Queue depth: {depths} | processed: {done}")
+
+    def _count(self, stage: str):
+        with self.lock:
+            self.processed[stage] += 1
+
+    def _run_stage(self, stage: str, source: queue.Queue, handle):
+        while True:
+            item = source.get()
+            if item is _DONE:
+                return
+            try:
+                handle(item)
+                self._count(stage)
+            except Exception as e:
+                self.on_error(stage, item, e)
+
+    def _discover(self, group):
+        jobs = self.discover(group) or []
+        if self.dedup:
+            self.dedup_q.put((group, jobs))
+            return
+        for job in jobs:
+            self.download_q.put(job)
+
+    def _run_dedup(self):
+        # Takes every account discovered since the last pass, so one check covers them all
+        finished = False
+        while not finished:
+            batch = [self.dedup_q.get()]
+            while True:
+                try:
+                    batch.append(self.dedup_q.get_nowait())
+                except queue.Empty:
+                    break
+
+            finished = _DONE in batch
+            batch = [item for item in batch if item is not _DONE]
+            if not batch:
+                continue
+            try:
+                jobs = self.dedup(batch)
+            except Exception as e:
+                for group, _ in batch:
+                    self.on_error("discover", group, e)
+                continue
+
+            with self.lock:
+                self.processed["dedup"] += len(batch)
+            for job in jobs:
+                self.download_q.put(job)
+
+    def _download(self, job):
+        self.transcode_q.put(self.download(job))
+
+    def _transcode(self, pool, job):
+        if self.transcode and job.get("media_path"):
+            with metrics.span("transcode"):
+                job["media_path"] = pool.submit(self.transcode, job["media_path"]).result()
+        self.commit_q.put(job)
+
+    def _start(self, name: str, count: int, target, *args) -> list:
+        threads = [
+            threading.Thread(target=target, args=args, name=f"{name}-{i}", daemon=True)
+            for i in range(max(1, int(count)))
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _drain(self, threads: list, next_q: queue.Queue, next_count: int):
+        for t in threads:
+            t.join()
+        for _ in range(next_count):
+            next_q.put(_DONE)
+
+    def _report(self):
+        interval = self.cfg["report_interval_seconds"]
+        while not self.finished.wait(interval):
+            self.log_depths()
+
+    def run(self, groups: list):
+        for group in groups:
+            self.groups_q.put(group)
+
+        discovery_count = max(1, int(self.cfg["discovery_workers"]))
+        download_count = max(1, int(self.cfg["download_workers"]))
+        transcode_count = max(1, int(self.cfg["transcode_workers"]))
+
+        for _ in range(discovery_count):
+            self.groups_q.put(_DONE)
+
+        logging.info(
+            f"🏭 Pipeline: {discovery_count} discovery, {download_count} download, "
+            f"{transcode_count} transcode worker(s)"
+        )
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        started = time.monotonic()
+        reporter = threading.Thread(target=self._report, name="pipeline-report", daemon=True)
+        reporter.start()
+
+        with ProcessPoolExecutor(max_workers=transcode_count) as pool:
+            discoverers = self._start("discover", discovery_count, self._run_stage, "discover", self.groups_q, self._discover)
+            downloaders = self._start("download", download_count, self._run_stage, "download", self.download_q, self._download)
+            transcoders = self._start(
+                "transcode", transcode_count, self._run_stage, "transcode", self.transcode_q,
+                lambda job: self._transcode(pool, job)
+            )
+            committers = self._start("commit", 1, self._run_stage, "commit", self.commit_q, self.commit)
+
+            if self.dedup:
+                deduper = self._start("dedup", 1, self._run_dedup)
+                self._drain(discoverers, self.dedup_q, 1)
+                self._drain(deduper, self.download_q, download_count)
+            else:
+                self._drain(discoverers, self.download_q, download_count)
+            self._drain(downloaders, self.transcode_q, transcode_count)
+            self._drain(transcoders, self.commit_q, 1)
+            for t in committers:
+                t.join()
+
+        self.finished.set()
+        self.log_depths()
+        logging.info(f"🏁 Pipeline finished in {time.monotonic() - started:.1f}s")
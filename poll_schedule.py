@@ -0,0 +1,53 @@
+DEFAULT_ADAPTIVE_CONFIG = {
+    "enabled": True,
+    "min_interval_minutes": 60,
+    "max_interval_minutes": 1440,
+    "backoff_factor": 2.0,
+    "speedup_factor": 0.5,
+    "cadence_weight": 0.3,
+    "due_slack_minutes": 5,
+}
+
+
+def load_adaptive_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_ADAPTIVE_CONFIG)
+    cfg.update(config.get("adaptive_schedule", {}))
+    return cfg
+
+
+def update_cadence(cadence, previous_ts, new_timestamps: list, weight: float):
+    timestamps = sorted(ts for ts in [previous_ts, *new_timestamps] if ts)
+
+    for prev, cur in zip(timestamps, timestamps[1:]):
+        gap = cur - prev
+        if gap <= 0:
+            continue
+        cadence = gap if cadence is None else (1 - weight) * cadence + weight * gap
+
+    return int(cadence) if cadence else None
+
+
+def next_poll_interval(interval, found_new: bool, cadence, cfg: dict) -> int:
+    min_interval = cfg["min_interval_minutes"] * 60
+    max_interval = cfg["max_interval_minutes"] * 60
+    interval = interval or min_interval
+
+    if found_new:
+        interval *= cfg["speedup_factor"]
+        if cadence:
+            interval = min(interval, cadence / 2)
+    else:
+        interval *= cfg["backoff_factor"]
+        # Never back off past the channel's usual posting gap
+        if cadence:
+            interval = min(interval, max(cadence, min_interval))
+
+    return int(max(min_interval, min(max_interval, interval)))
+
+
+def plan_next_poll(group: dict, new_timestamps: list, cfg: dict) -> tuple:
+    cadence = update_cadence(
+        group.get("post_cadence"), group.get("last_video_ts"), new_timestamps, cfg["cadence_weight"]
+    )
+    interval = next_poll_interval(group.get("poll_interval"), bool(new_timestamps), cadence, cfg)
+    return interval, cadence
@@ -0,0 +1,218 @@
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+
+from metrics import metrics
+
+DEFAULT_RATE_LIMITS = {
+    "metadata": {"rate_per_minute": 30, "burst": 5},
+    "media": {"rate_per_minute": 20, "burst": 3},
+    "breaker": {
+        "cooldown_min_seconds": 300,
+        "cooldown_max_seconds": 900,
+        "max_wait_seconds": 60,
+    },
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def is_rate_limit_error(error_str: str) -> bool:
+    # A bare "429" also turns up in video ids and URLs
+    return "HTTP Error 429" in error_str or "Too Many Requests" in error_str
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.lock = threading.Lock()
+        self.configure(rate_per_minute, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.waited_total = 0.0
+
+    def configure(self, rate_per_minute: float, burst: int):
+        with self.lock:
+            self.rate = max(rate_per_minute, 0.001) / 60.0
+            self.capacity = max(int(burst), 1)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.waited_total += waited
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
+
+    def available(self) -> float:
+        with self.lock:
+            self._refill()
+            return self.tokens
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, cooldown_min: int, cooldown_max: int, max_wait: int):
+        self.name = name
+        self.cooldown_min = cooldown_min
+        self.cooldown_max = cooldown_max
+        self.max_wait = max_wait
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+        self.throttled_total = 0
+        self.cond = threading.Condition()
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logging.warning(f"🚥 {self.name} circuit {self.state} -> {state}")
+            self.state = state
+
+    def before_request(self):
+        with self.cond:
+            while True:
+                now = time.monotonic()
+
+                if self.state == OPEN:
+                    remaining = self.open_until - now
+                    if remaining <= 0:
+                        self._set_state(HALF_OPEN)
+                        continue
+                    if remaining > self.max_wait:
+                        raise CircuitOpenError(
+                            f"{self.name} circuit open after 429, {int(remaining)}s cooldown left"
+                        )
+                    self.cond.wait(remaining)
+                    continue
+
+                if self.state == HALF_OPEN:
+                    # Only one probe request is let through until it reports back
+                    if self.probe_in_flight:
+                        self.cond.wait(self.max_wait or None)
+                        continue
+                    self.probe_in_flight = True
+
+                return
+
+    def accepts_requests(self) -> bool:
+        # An open circuit whose cooldown has run out is ready for its half-open probe
+        with self.cond:
+            if self.state == OPEN:
+                return self.open_until <= time.monotonic()
+            return not (self.state == HALF_OPEN and self.probe_in_flight)
+
+    def record_result(self, throttled: bool):
+        with self.cond:
+            was_probe = self.probe_in_flight
+            self.probe_in_flight = False
+
+            if throttled:
+                self.throttled_total += 1
+                self.trips += 1
+                cooldown = random.randint(self.cooldown_min, self.cooldown_max)
+                if was_probe:
+                    cooldown = min(cooldown * 2, self.cooldown_max * 2)
+                self.open_until = time.monotonic() + cooldown
+                self._set_state(OPEN)
+                logging.warning(f"⚠️ {self.name} rate limited, pausing for {cooldown // 60} minutes")
+            elif self.state == HALF_OPEN:
+                self._set_state(CLOSED)
+
+            self.cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self.cond:
+            return {
+                "state": self.state,
+                "cooldown_left": max(0, int(self.open_until - time.monotonic())) if self.state == OPEN else 0,
+                "trips": self.trips,
+                "throttled_total": self.throttled_total,
+            }
+
+
+class RateLimiter:
+    def __init__(self, config: dict = None, scope: str = "global"):
+        self.scope = scope
+        self.buckets = {}
+        self.breakers = {}
+        self.configure(config or {})
+
+    def configure(self, config: dict):
+        breaker_cfg = {**DEFAULT_RATE_LIMITS["breaker"], **config.get("breaker", {})}
+
+        for kind in ("metadata", "media"):
+            cfg = {**DEFAULT_RATE_LIMITS[kind], **config.get(kind, {})}
+
+            if kind in self.buckets:
+                self.buckets[kind].configure(cfg["rate_per_minute"], cfg["burst"])
+            else:
+                self.buckets[kind] = TokenBucket(cfg["rate_per_minute"], cfg["burst"])
+
+            breaker = self.breakers.get(kind)
+            if breaker is None:
+                breaker = self.breakers[kind] = CircuitBreaker(
+                    kind, breaker_cfg["cooldown_min_seconds"],
+                    breaker_cfg["cooldown_max_seconds"], breaker_cfg["max_wait_seconds"]
+                )
+            else:
+                breaker.cooldown_min = breaker_cfg["cooldown_min_seconds"]
+                breaker.cooldown_max = breaker_cfg["cooldown_max_seconds"]
+                breaker.max_wait = breaker_cfg["max_wait_seconds"]
+
+    @contextmanager
+    def request(self, kind: str):
+        breaker = self.breakers[kind]
+        breaker.before_request()
+
+        try:
+            waited = self.buckets[kind].acquire()
+            metrics.observe("rate_limit_wait_seconds", waited, kind=kind, scope=self.scope)
+        except BaseException:
+            breaker.record_result(throttled=False)
+            raise
+
+        try:
+            yield
+        except Exception as e:
+            throttled = is_rate_limit_error(str(e))
+            if throttled:
+                metrics.inc("tiktok_throttled_total", kind=kind, scope=self.scope)
+            breaker.record_result(throttled=throttled)
+            raise
+        else:
+            breaker.record_result(throttled=False)
+
+    def snapshot(self) -> dict:
+        return {
+            kind: {
+                **self.breakers[kind].snapshot(),
+                "tokens": round(self.buckets[kind].available(), 2),
+                "waited_seconds": round(self.buckets[kind].waited_total, 1),
+            }
+            for kind in self.buckets
+        }
+
+    def log_state(self):
+        for kind, state in self.snapshot().items():
+            logging.info(
+                f"🚥 {kind}: circuit={state['state']} tokens={state['tokens']} "
+                f"429s={state['throttled_total']} waited={state['waited_seconds']}s"
+            )
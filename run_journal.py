@@ -0,0 +1,61 @@
+import logging
+
+from db import db_adapter as db
+
+DEFAULT_JOURNAL_CONFIG = {
+    "enabled": True,
+    "resume_window_minutes": 60,
+}
+
+
+def load_journal_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_JOURNAL_CONFIG)
+    cfg.update(config.get("journal", {}))
+    return cfg
+
+
+class RunJournal:
+    def __init__(self):
+        self.run_id = None
+
+    def open(self, node_id: str, cfg: dict) -> set:
+        self.run_id = None
+        if not cfg["enabled"]:
+            return set()
+
+        self.run_id, resumed = db.open_run(node_id, int(cfg["resume_window_minutes"]) * 60)
+        if self.run_id is None:
+            logging.warning("⚠️ Run journal unavailable, crawling without checkpoints")
+            return set()
+
+        if not resumed:
+            logging.info(f"📓 Started run #{self.run_id}")
+            return set()
+
+        completed = db.get_completed_group_ids(self.run_id)
+        logging.info(f"📓 Resuming run #{self.run_id}, {len(completed)} account(s) already done")
+        return completed
+
+    def stage(self, group_id: int, stage: str):
+        if self.run_id is not None:
+            db.mark_account_stage(self.run_id, group_id, stage)
+
+    def finish(self):
+        if self.run_id is not None:
+            db.finish_run(self.run_id)
+            logging.info(f"📓 Run #{self.run_id} finished")
+
+
+def log_run_history(limit: int = 20):
+    rows = db.fetch_run_history(limit)
+    if not rows:
+        logging.info("📓 No runs recorded yet")
+        return
+
+    for row in rows:
+        minutes, seconds = divmod(row["duration"] or 0, 60)
+        logging.info(
+            f"#{row['id']} {row['node_id']} {row['started_at']:%Y-%m-%d %H:%M} "
+            f"{row['status']:<11} {minutes}m{seconds:02d}s "
+            f"✅{row['success'] or 0} ⏭️{row['skipped'] or 0} ❌{row['failed'] or 0}"
+        )
@@ -0,0 +1,89 @@
+import os
+import sys
+import stat
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+
+# Stand-in ffmpeg: copies stdin (or the -i file) to the output path, or fails/hangs on
+# request; inputs named *corrupt* always fail
+FAKE_FFMPEG = f"""#!{sys.executable}
+import os, sys, time
+mode = os.environ.get("FAKE_FFMPEG", "ok")
+if mode == "hang":
+    time.sleep(30)
+src = sys.argv[sys.argv.index("-i") + 1]
+if mode == "fail" or "corrupt" in src:
+    sys.stderr.write("Invalid data found when processing input")
+    sys.exit(1)
+data = sys.stdin.buffer.read() if src == "pipe:0" else open(src, "rb").read()
+with open(sys.argv[-1], "wb") as f:
+    f.write(data)
+"""
+
+
+@pytest.fixture
+def ffmpeg(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "ffmpeg"
+    script.write_text(FAKE_FFMPEG)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return lambda mode: monkeypatch.setenv("FAKE_FFMPEG", mode)
+
+
+def crawler_config(**sections) -> dict:
+    config = {
+        "crawler": {"concurrency": 4, "db_batch_size": 5},
+        "adaptive_schedule": {"enabled": True},
+        "rate_limits": {
+            "metadata": {"rate_per_minute": 60000, "burst": 100},
+            "media": {"rate_per_minute": 60000, "burst": 100},
+        },
+        "pipeline": {"enabled": False, "report_interval_seconds": 3600},
+        "audio": {"output": "native", "streaming": False},
+        "cluster": {"enabled": False},
+        "identities": {"enabled": False},
+        "journal": {"enabled": True},
+        "metrics": {"enabled": False},
+    }
+    for name, values in sections.items():
+        config[name] = {**config.get(name, {}), **values}
+    return config
+
+
+@pytest.fixture
+def crawler(tmp_path, monkeypatch):
+    # tiktok_audio_downloader wired to the in-memory DB and fake TikTok used by the benchmarks:
+    # 4 accounts with 5 videos each, the newest 2 of them not crawled yet
+    import cluster
+    import run_journal
+    import audio_retention
+    import tiktok_audio_downloader as tad
+    from api_health import StrategyHealth
+    from rate_limiter import RateLimiter
+    from fake_db import InMemoryDB, make_groups
+    from fake_tiktok import FakeTikTok, FakeYoutubeDLPool
+
+    monkeypatch.chdir(tmp_path)
+    tiktok = FakeTikTok(videos=5, latency=0, media_latency=0, media_bytes=1024)
+    fake_db = InMemoryDB(make_groups(4, tiktok.timestamps()[2]))
+    for module in (tad, run_journal, cluster, audio_retention):
+        monkeypatch.setattr(module, "db", fake_db)
+
+    state = SimpleNamespace(tad=tad, db=fake_db, tiktok=tiktok, config=crawler_config())
+    monkeypatch.setattr(tad, "ydl_pool", FakeYoutubeDLPool(tiktok))
+    monkeypatch.setattr(tad, "api_health", StrategyHealth(str(tmp_path / "api_health.json")))
+    # A fresh limiter per test, so breakers tripped or tokens spent earlier do not leak in
+    monkeypatch.setattr(tad, "limiter", RateLimiter(state.config["rate_limits"]))
+    monkeypatch.setattr(tad, "load_config", lambda: state.config)
+    monkeypatch.setattr(tad, "random_delay", lambda *args, **kwargs: None)
+    monkeypatch.setattr(tad, "pick_delay", lambda *args, **kwargs: 0)
+    monkeypatch.setattr(tad, "COOKIE_REFRESH_ENABLED", False)
+    monkeypatch.setattr(tad, "AUDIO_DIR", str(tmp_path / "audio"))
+    return state
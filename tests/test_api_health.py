@@ -0,0 +1,100 @@
+import pytest
+
+from api_health import REPROBE_SECONDS, StrategyHealth, is_host_failure
+
+
+@pytest.mark.parametrize("message", [
+    "ERROR: [TikTok] Unable to download API page: HTTP Error 503: Service Unavailable",
+    "ERROR: [TikTok] Unable to download webpage: <urlopen error [Errno 111] Connection refused>",
+    "ERROR: [TikTok] Read timed out",
+])
+def test_transport_and_server_errors_count_against_host(message):
+    assert is_host_failure(RuntimeError(message))
+
+
+@pytest.mark.parametrize("message", [
+    "ERROR: [TikTok] HTTP Error 429: Too Many Requests",
+    "ERROR: [TikTok] This account is private",
+    "ERROR: [TikTok] Please log in to view this account",
+    "ERROR: [TikTok] Unable to extract secondary user ID",
+    "ERROR: [TikTok] HTTP Error 404: Not Found",
+    "ERROR: [TikTok] Video 7294291234567890429 is unavailable",
+])
+def test_account_and_throttle_errors_do_not_count_against_host(message):
+    assert not is_host_failure(RuntimeError(message))
+
+
+def test_quarantined_strategy_is_tried_last(tmp_path):
+    health = StrategyHealth(str(tmp_path / "api_health.json"))
+    for _ in range(3):
+        health.record("api16", False, 1.0)
+    health.record("api22", True, 1.0)
+
+    # The untried hostname is probed once, then waits behind the healthy one
+    assert health.order(["api16", "api22", "api"]) == ["api", "api22"]
+    assert health.order(["api16", "api22", "api"]) == ["api22", "api"]
+
+    health.save()
+    assert StrategyHealth(health.path).is_quarantined("api16")
+
+
+def test_private_account_does_not_mark_hostnames_unhealthy(crawler, monkeypatch):
+    def private(username):
+        raise RuntimeError("ERROR: [TikTok] This account is private")
+
+    monkeypatch.setattr(crawler.tiktok, "resolve", private)
+
+    assert crawler.tad.resolve_tiktok_target("user0") == "https://www.tiktok.com/@user0"
+    assert crawler.tad.api_health.stats == {}
+
+
+def test_server_errors_mark_hostnames_unhealthy(crawler, monkeypatch):
+    def unavailable(username):
+        raise RuntimeError("ERROR: [TikTok] HTTP Error 502: Bad Gateway")
+
+    monkeypatch.setattr(crawler.tiktok, "resolve", unavailable)
+    crawler.tad.resolve_tiktok_target("user0")
+
+    stats = crawler.tad.api_health.stats
+    assert sorted(stats) == ["api", "api16", "api22", "default"]
+    assert all(stat["consecutive_failures"] == 1 for stat in stats.values())
+
+
+def test_slow_success_is_not_outranked_by_an_untried_strategy(tmp_path):
+    health = StrategyHealth(str(tmp_path / "api_health.json"))
+    health.record("secuid", True, 2.0)
+
+    assert health.order(["secuid", "web"]) == ["web", "secuid"]
+    assert health.order(["secuid", "web"]) == ["secuid", "web"]
+
+
+def test_resolution_is_skipped_while_web_listing_goes_first(crawler):
+    health = crawler.tad.api_health
+    health.record("web", True, 0.1)
+    health.record("secuid", False, 0.1)
+
+    assert len(crawler.tad.fetch_video_entries("bench_user_1")) == 5
+    assert crawler.tiktok.requests["profile"] == 0
+
+
+def test_demoted_secuid_is_probed_again_after_a_while(crawler):
+    health = crawler.tad.api_health
+    health.record("web", True, 0.1)
+    health.record("secuid", False, 0.1)
+    health.stats["secuid"]["last_tried"] -= REPROBE_SECONDS
+
+    crawler.tad.fetch_video_entries("bench_user_1")
+
+    assert crawler.tiktok.requests["profile"] == 1
+    assert health.stats["secuid"]["consecutive_failures"] == 0
+
+
+def test_throttled_listing_is_left_to_the_rate_limiter(crawler, monkeypatch):
+    def throttled(target):
+        raise RuntimeError("ERROR: [TikTok] HTTP Error 429: Too Many Requests")
+
+    monkeypatch.setattr(crawler.tiktok, "listing", throttled)
+
+    with pytest.raises(RuntimeError):
+        crawler.tad.fetch_video_entries("bench_user_1")
+    assert "secuid" not in crawler.tad.api_health.stats
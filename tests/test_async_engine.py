@@ -0,0 +1,62 @@
+import time
+import threading
+
+import pytest
+
+from async_engine import AsyncEngine, load_async_config
+
+
+def crawl_with_delays(groups: list, concurrency: int, delay: float) -> tuple:
+    engine = AsyncEngine(load_async_config({"async_engine": {"io_workers": 2}}))
+    lock = threading.Lock()
+    started = {}
+    active = [0, 0]
+
+    def handle(group):
+        with lock:
+            started[group] = time.monotonic()
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+
+    begin = time.monotonic()
+    engine.run_once(lambda: engine.crawl(groups, handle, lambda: 0, lambda: delay, concurrency))
+    return time.monotonic() - begin, started, active[1]
+
+
+def test_delays_pace_each_lane_like_a_pool_worker():
+    elapsed, started, peak = crawl_with_delays(list(range(6)), concurrency=2, delay=0.2)
+
+    # 6 accounts on 2 lanes: each lane waits out 3 after-delays
+    assert elapsed >= 0.6
+    assert peak <= 2
+    order = sorted(started.values())
+    assert order[2] - order[0] >= 0.2
+
+
+def test_pipeline_cannot_run_under_the_async_engine():
+    config = {"async_engine": {"enabled": True}, "pipeline": {"enabled": True}}
+    with pytest.raises(ValueError):
+        load_async_config(config)
+
+    config["async_engine"]["enabled"] = False
+    assert not load_async_config(config)["enabled"]
+
+
+def test_waiting_lanes_hold_no_io_thread():
+    # 20 lanes waiting at once on 2 io workers still finish in about one delay
+    elapsed, started, peak = crawl_with_delays(list(range(20)), concurrency=20, delay=0.3)
+
+    assert len(started) == 20
+    assert elapsed < 1.5
+
+
+def test_async_engine_writes_the_same_posts_as_the_pool(crawler, monkeypatch):
+    monkeypatch.setattr(crawler.tad, "async_engine", None)
+
+    crawler.tad.start_async_engine(crawler.config).run_once(crawler.tad.main)
+
+    assert len(crawler.db.posts) == 4 * 2
+    assert crawler.tiktok.requests["media"] == 4 * 2
@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+
+import audio_retention
+import tiktok_audio_downloader as tad
+from audio_retention import ARCHIVE, HOT, AudioIndex, enforce_retention, load_retention_config
+from fake_db import InMemoryDB
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake = InMemoryDB([])
+    monkeypatch.setattr(audio_retention, "db", fake)
+    monkeypatch.setattr(tad, "db", fake)
+    index = AudioIndex(str(tmp_path / "index.sqlite"))
+    index.configure({"enabled": True})
+    return fake, index
+
+
+def add_audio(fake, index, name: str, size_mb: int, accessed_ago: float) -> str:
+    path = os.path.join(tad.AUDIO_DIR, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\0" * (size_mb * MB))
+    fake.insert_yt_posts([(name, name, f"https://www.tiktok.com/@u/video/{name}", path, None)])
+    index.record(path, size_mb * MB)
+    index._execute("UPDATE audio_files SET accessed_at = ? WHERE path = ?", (time.time() - accessed_ago, path))
+    return path
+
+
+def post_paths(fake) -> dict:
+    return {video_id: path for _, video_id, _, path in fake.posts.values()}
+
+
+def retention(**overrides):
+    return load_retention_config({"retention": {"enabled": True, "max_size_gb": 4 * MB / 1024 ** 3, **overrides}})
+
+
+def test_lru_evicts_coldest_down_to_low_watermark(store):
+    fake, index = store
+    for i, ago in enumerate((500, 100, 300, 10)):
+        add_audio(fake, index, f"tt_{i}.m4a", 2, ago)
+
+    freed = enforce_retention(index, retention(low_watermark=0.5), tad.AUDIO_DIR)
+
+    assert freed == 6 * MB
+    assert index.total_size(HOT) == 2 * MB
+    paths = post_paths(fake)
+    assert [name for name, path in sorted(paths.items()) if path] == ["tt_3.m4a"]
+    assert sorted(os.listdir(tad.AUDIO_DIR)) == ["tt_3.m4a"]
+
+
+def test_age_limit_applies_without_size_pressure(store):
+    fake, index = store
+    add_audio(fake, index, "old.m4a", 1, 10 * 86400)
+    add_audio(fake, index, "new.m4a", 1, 60)
+
+    enforce_retention(index, retention(max_size_gb=0, max_age_days=7), tad.AUDIO_DIR)
+    assert post_paths(fake) == {"old.m4a": None, "new.m4a": os.path.join(tad.AUDIO_DIR, "new.m4a")}
+
+
+def test_archived_audio_is_left_out_of_the_mp3_backlog(store, ffmpeg, monkeypatch):
+    ffmpeg("ok")
+    fake, index = store
+    cfg = retention(archive_dir="archive", low_watermark=1.0)
+    for i, ago in enumerate((500, 400, 10)):
+        add_audio(fake, index, f"tt_{i}.m4a", 2, ago)
+
+    enforce_retention(index, cfg, tad.AUDIO_DIR)
+    archived = os.path.join("archive", "tt_0.m4a")
+    assert post_paths(fake)["tt_0.m4a"] == archived and os.path.exists(archived)
+    assert index.total_size(ARCHIVE) == 2 * MB
+
+    monkeypatch.setattr(tad, "retention_cfg", cfg)
+    monkeypatch.setattr(tad, "audio_index", index)
+    tad.transcode_backlog(batch_size=10)
+
+    paths = post_paths(fake)
+    assert paths["tt_0.m4a"] == archived
+    assert paths["tt_1.m4a"].endswith(".mp3") and paths["tt_2.m4a"].endswith(".mp3")
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+import tiktok_audio_downloader as tad
+from fake_db import InMemoryDB
+
+
+@pytest.fixture
+def fake_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake = InMemoryDB([])
+    monkeypatch.setattr(tad, "db", fake)
+    return fake
+
+
+def write_media(name: str, content: bytes) -> str:
+    os.makedirs(tad.AUDIO_DIR, exist_ok=True)
+    path = os.path.join(tad.AUDIO_DIR, name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_same_content_is_stored_once(fake_db):
+    digest, first = tad.store_audio(write_media("tt_1.m4a", b"sound"))
+    again, second = tad.store_audio(write_media("tt_2.m4a", b"sound"))
+
+    assert (digest, first) == (again, second)
+    assert not os.path.exists(os.path.join(tad.AUDIO_DIR, "tt_2.m4a"))
+    assert fake_db.get_blob_path(digest) == first
+
+
+def test_transcoded_blob_is_found_by_hash(fake_db):
+    digest, stored = tad.store_audio(write_media("tt_1.m4a", b"sound"))
+
+    # The MP3 backlog moves the blob to <sha>.mp3 and repoints it
+    mp3 = os.path.splitext(stored)[0] + ".mp3"
+    os.replace(stored, mp3)
+    fake_db.update_audio_paths([(stored, mp3)])
+
+    again, path = tad.store_audio(write_media("tt_2.m4a", b"sound"))
+    assert (again, path) == (digest, mp3)
+    assert not os.path.exists(stored)
+    assert os.listdir(os.path.dirname(mp3)) == [os.path.basename(mp3)]
+
+
+def test_missing_blob_is_stored_again(fake_db):
+    digest, stored = tad.store_audio(write_media("tt_1.m4a", b"sound"))
+    os.remove(stored)
+
+    again, path = tad.store_audio(write_media("tt_2.m4a", b"sound"))
+    assert (again, path) == (digest, stored) and os.path.exists(stored)
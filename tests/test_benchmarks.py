@@ -0,0 +1,35 @@
+import os
+import sys
+import json
+import subprocess
+
+from bench_crawl import ROOT, check_baseline
+
+BENCH = os.path.join(ROOT, "benchmarks", "bench_crawl.py")
+
+
+def run_bench(tmp_path, *flags) -> list:
+    saved = tmp_path / "results.json"
+    output = subprocess.run(
+        [sys.executable, BENCH, "--sizes", "6", "--concurrency", "3", "--latency-ms", "1",
+         "--media-latency-ms", "1", "--db-latency-ms", "0", "--media-kb", "4", "--save", str(saved), *flags],
+        capture_output=True, text=True, cwd=ROOT, timeout=120,
+    )
+    assert output.returncode == 0, output.stderr[-2000:]
+    return json.loads(saved.read_text())
+
+
+def test_bench_crawls_every_account_in_each_mode(tmp_path):
+    for flags in ((), ("--pipeline",), ("--async",)):
+        [result] = run_bench(tmp_path, *flags)
+        assert result["posts_saved"] == 6
+        assert result["requests"]["media"] == 6
+
+
+def test_baseline_check_flags_regressions(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps([{"accounts": 100, "mode": "pool", "accounts_per_minute": 1000}]))
+
+    assert check_baseline([{"accounts": 100, "mode": "pool", "accounts_per_minute": 850}], str(baseline), 0.2)
+    assert not check_baseline([{"accounts": 100, "mode": "pool", "accounts_per_minute": 700}], str(baseline), 0.2)
+    assert "REGRESSION" in capsys.readouterr().out
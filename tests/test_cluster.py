@@ -0,0 +1,39 @@
+from conftest import crawler_config
+
+
+def test_leases_are_disjoint_between_nodes(crawler):
+    first = crawler.db.lease_groups("node-a", 3, 60, due_only=False)
+    second = crawler.db.lease_groups("node-b", 3, 60, due_only=False)
+    assert [g["id"] for g in first] == [1, 2, 3]
+    assert [g["id"] for g in second] == [4]
+
+    crawler.db.release_leases("node-a", [1])
+    assert [g["id"] for g in crawler.db.lease_groups("node-b", 3, 60, due_only=False)] == [1, 4]
+
+
+def test_finished_accounts_are_not_leased_again_in_the_same_run(crawler):
+    crawler.config = crawler_config(cluster={"enabled": True, "node_id": "node-a", "batch_size": 2},
+                                    adaptive_schedule={"enabled": False})
+    other_run_started = crawler.db.current_timestamp()
+
+    crawler.tad.main()
+    assert len(crawler.db.posts) == 4 * 2
+    assert all(g["lease_owner"] is None for g in crawler.db.groups.values())
+
+    # node-b started its run before node-a finished these accounts
+    assert crawler.db.lease_groups("node-b", 10, 60, due_only=False, crawled_since=other_run_started) == []
+    # its next run picks them up again
+    next_run = crawler.db.current_timestamp()
+    assert len(crawler.db.lease_groups("node-b", 10, 60, due_only=False, crawled_since=next_run)) == 4
+
+
+def test_heartbeat_stop_releases_without_marking_crawled(crawler):
+    import cluster
+
+    crawler.db.lease_groups("node-a", 10, 60, due_only=False)
+    heartbeat = cluster.NodeHeartbeat("node-a", 60, 60)
+    heartbeat.start()
+    heartbeat.stop()
+
+    assert crawler.db.nodes["node-a"][1] == "stopped"
+    assert all(g["lease_owner"] is None and g["last_crawled_at"] is None for g in crawler.db.groups.values())
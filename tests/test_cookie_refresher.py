@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import types
+import builtins
+
+import pytest
+
+from cookie_refresher import CookieRefreshService, CookieState
+
+
+class FakeBrowser:
+    def __init__(self, fail_close: bool = False):
+        self.fail_close = fail_close
+
+    def new_context(self, **kwargs):
+        raise AssertionError("not expected")
+
+    def close(self):
+        if self.fail_close:
+            raise RuntimeError("browser crashed")
+
+
+def fake_playwright(monkeypatch, launch):
+    class Playwright:
+        chromium = types.SimpleNamespace(launch=launch)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    sync_api = types.ModuleType("playwright.sync_api")
+    sync_api.sync_playwright = Playwright
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", sync_api)
+
+
+def test_failed_launch_fails_pending_futures(monkeypatch):
+    def launch(**kwargs):
+        raise RuntimeError("Executable doesn't exist")
+
+    fake_playwright(monkeypatch, launch)
+    service = CookieRefreshService(idle_seconds=1)
+
+    future = service.refresh("alice")
+    with pytest.raises(RuntimeError, match="Executable"):
+        future.result(timeout=5)
+    assert service.pending == {} and service.thread is None
+
+    # The next caller gets a fresh attempt instead of the dead future
+    assert service.refresh("alice") is not future
+
+
+def test_refresh_errors_keep_the_service_running(monkeypatch):
+    fake_playwright(monkeypatch, lambda **kwargs: FakeBrowser())
+    service = CookieRefreshService(idle_seconds=1)
+    monkeypatch.setattr(service, "_refresh", lambda browser, contexts, identity: f"{identity}.txt")
+
+    assert service.refresh("alice").result(timeout=5) == "alice.txt"
+    thread = service.thread
+    assert service.refresh("bob").result(timeout=5) == "bob.txt"
+    assert service.thread is thread
+    service.stop()
+    assert service.thread is None and service.pending == {}
+
+
+
+def write_cookies(path, cookies: dict):
+    lines = ["# Netscape HTTP Cookie File"]
+    for name, expiry in cookies.items():
+        lines.append(f".tiktok.com\tTRUE\t/\tTRUE\t{int(expiry)}\t{name}\tvalue")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_cookie_state_is_parsed_once_per_file_change(tmp_path, monkeypatch):
+    path = tmp_path / "cookies.txt"
+    now = time.time()
+    write_cookies(path, {"sessionid": now + 3600, "tt_csrf_token": now + 86400})
+    state = CookieState(str(path))
+
+    opened = []
+    real_open = builtins.open
+    monkeypatch.setattr(builtins, "open", lambda *args, **kwargs: opened.append(args[0]) or real_open(*args, **kwargs))
+
+    assert state.is_valid() and state.is_valid()
+    assert state.needs_refresh() and 3500 < state.seconds_left() <= 3600
+    assert opened == [str(path)]
+
+    write_cookies(path, {"sessionid": now - 60, "tt_csrf_token": now - 60})
+    # Make sure the rewrite is seen even on coarse mtime filesystems
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert not state.is_valid()
+    assert len(opened) == 2
+
+
+def test_missing_cookie_file_is_invalid(tmp_path):
+    state = CookieState(str(tmp_path / "missing.txt"))
+
+    assert not state.is_valid()
+    assert state.seconds_left() == 0.0
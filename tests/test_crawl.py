@@ -0,0 +1,203 @@
+import pytest
+
+
+def test_posts_already_in_the_database_are_not_downloaded_again(crawler):
+    tad, tiktok = crawler.tad, crawler.tiktok
+    newest = next(tiktok.entries("bench_user_1"))
+    url = tad.build_video_url("bench_user_1", newest["id"])
+    crawler.db.insert_yt_posts([("t_existing", "old", url, "audio/old.m4a", None)])
+
+    tad.main()
+
+    assert tiktok.requests["media"] == 4 * 2 - 1
+    assert len(crawler.db.posts) == 4 * 2
+    assert crawler.db.posts[url][3] == "audio/old.m4a"
+
+
+def track_known_lookups(crawler, monkeypatch) -> list:
+    looked_up = []
+    get_known_urls = crawler.db.get_known_urls
+    monkeypatch.setattr(crawler.db, "get_known_urls", lambda urls: looked_up.append(list(urls)) or get_known_urls(urls))
+    return looked_up
+
+
+@pytest.mark.parametrize("mode", ["pool", "async"])
+def test_known_urls_are_checked_once_per_round(crawler, monkeypatch, mode):
+    looked_up = track_known_lookups(crawler, monkeypatch)
+
+    if mode == "async":
+        monkeypatch.setattr(crawler.tad, "async_engine", None)
+        crawler.tad.start_async_engine(crawler.config).run_once(crawler.tad.main)
+    else:
+        crawler.tad.main()
+
+    assert len(looked_up) == 1
+    assert len(looked_up[0]) == 4 * 2 and all("/video/" in url for url in looked_up[0])
+
+
+def test_pipeline_checks_each_candidate_once(crawler, monkeypatch):
+    crawler.config["pipeline"] = {
+        "enabled": True, "discovery_workers": 2, "download_workers": 2, "transcode_workers": 1,
+        "queue_size": 2, "report_interval_seconds": 3600,
+    }
+    looked_up = track_known_lookups(crawler, monkeypatch)
+
+    crawler.tad.main()
+
+    urls = [url for batch in looked_up for url in batch]
+    assert len(urls) == len(set(urls)) == 4 * 2
+
+
+def test_postprocessing_is_timed_apart_from_the_download(crawler, monkeypatch):
+    from metrics import Metrics
+
+    stages = Metrics()
+    monkeypatch.setattr(crawler.tad, "metrics", stages)
+
+    crawler.tad.main()
+
+    totals = stages.stage_totals()
+    assert totals["download"][0] == totals["transcode"][0] == 4 * 2
+
+
+def test_posts_are_written_in_batches(crawler, monkeypatch):
+    batches = []
+    insert = crawler.db.insert_yt_posts
+    monkeypatch.setattr(crawler.db, "insert_yt_posts", lambda rows: batches.append(len(rows)) or insert(rows))
+
+    crawler.tad.main()
+
+    assert sum(batches) == 8 and max(batches) <= 5
+
+
+def test_maintenance_runs_when_nothing_is_due(crawler, monkeypatch):
+    import os
+    import time
+    from datetime import datetime, timedelta
+
+    for group in crawler.db.groups.values():
+        group["next_poll_at"] = datetime.now() + timedelta(hours=1)
+    os.makedirs(crawler.tad.AUDIO_DIR)
+    stale = os.path.join(crawler.tad.AUDIO_DIR, "tt_1.mp4.part")
+    open(stale, "wb").close()
+    os.utime(stale, (time.time() - 72 * 3600,) * 2)
+
+    backlog = []
+    monkeypatch.setattr(crawler.tad, "run_transcode_backlog", backlog.append)
+    crawler.config["audio"]["deferred_mp3"] = True
+
+    crawler.tad.main()
+
+    assert crawler.tiktok.requests["listing"] == 0 and not crawler.db.runs
+    assert not os.path.exists(stale)
+    assert backlog == [4]
+
+
+def test_worker_pool_bounds_concurrency_and_isolates_failures(crawler, monkeypatch):
+    import time
+    import threading
+
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def download(username, group, writer, videos=None):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        if group["id"] == 2:
+            raise RuntimeError("boom")
+        return "success", "ok"
+
+    monkeypatch.setattr(crawler.tad, "download_new_videos", download)
+    groups = list(crawler.db.groups.values())
+
+    success, skipped, failed = crawler.tad.run_worker_pool(groups, crawler.tad.PostWriter(5), 2)
+
+    assert active[1] == 2
+    assert len(success) == 3 and skipped == []
+    assert failed == [(groups[1]["tt_link"], groups[1]["tt_name"], "boom")]
+
+
+def test_watermark_skips_channels_with_nothing_new(crawler):
+    tad, tiktok = crawler.tad, crawler.tiktok
+    crawler.config["adaptive_schedule"] = {"enabled": False}
+
+    tad.main()
+    newest = tiktok.timestamps()[0]
+    assert all(g["last_video_ts"] == newest for g in crawler.db.groups.values())
+
+    downloads = tiktok.requests["media"]
+    tad.main()
+
+    assert tiktok.requests["media"] == downloads
+    assert len(crawler.db.posts) == 4 * 2
+
+
+def test_new_account_downloads_only_its_latest_video(crawler):
+    group = crawler.db.groups[1]
+    group["last_video_ts"] = None
+
+    crawler.tad.main()
+
+    assert group["last_video_ts"] == crawler.tiktok.timestamps()[0]
+    assert len(crawler.db.posts) == 1 + 3 * 2
+
+
+def test_watermark_stops_before_a_failed_download(crawler, monkeypatch):
+    tiktok = crawler.tiktok
+    older_new = tiktok.timestamps()[1]
+    download = tiktok.download
+
+    def flaky(username, video_id, outtmpl, ext):
+        if username == "bench_user_1" and int(video_id) // 10**9 == older_new:
+            raise RuntimeError("ERROR: [TikTok] Unable to download video data: HTTP Error 503")
+        return download(username, video_id, outtmpl, ext)
+
+    monkeypatch.setattr(tiktok, "download", flaky)
+    watermark = crawler.db.groups[1]["last_video_ts"]
+
+    crawler.tad.main()
+
+    # Videos go oldest first, so the watermark stays put and the next run retries both
+    assert crawler.db.groups[1]["last_video_ts"] == watermark
+    assert crawler.db.groups[2]["last_video_ts"] == tiktok.timestamps()[0]
+
+
+def test_pipeline_saves_the_same_posts_as_the_worker_pool(crawler):
+    crawler.config["pipeline"] = {
+        "enabled": True, "discovery_workers": 2, "download_workers": 2, "transcode_workers": 1,
+        "queue_size": 2, "report_interval_seconds": 3600,
+    }
+
+    crawler.tad.main()
+
+    assert len(crawler.db.posts) == 4 * 2
+    assert crawler.tiktok.requests["media"] == 4 * 2
+    assert all(g["last_video_ts"] == crawler.tiktok.timestamps()[0] for g in crawler.db.groups.values())
+
+
+def test_pipeline_holds_the_watermark_behind_a_failed_download(crawler, monkeypatch):
+    crawler.config["pipeline"] = {
+        "enabled": True, "discovery_workers": 1, "download_workers": 2, "transcode_workers": 1,
+        "queue_size": 2, "report_interval_seconds": 3600,
+    }
+    tiktok = crawler.tiktok
+    newest, older_new = tiktok.timestamps()[:2]
+    download = tiktok.download
+
+    def flaky(username, video_id, outtmpl, ext):
+        if username == "bench_user_1" and int(video_id) // 10**9 == older_new:
+            raise RuntimeError("ERROR: [TikTok] Unable to download video data: HTTP Error 503")
+        return download(username, video_id, outtmpl, ext)
+
+    monkeypatch.setattr(tiktok, "download", flaky)
+    watermark = crawler.db.groups[1]["last_video_ts"]
+
+    crawler.tad.main()
+
+    # Downloads run side by side, so the newer video is still saved
+    assert len(crawler.db.posts) == 4 * 2 - 1
+    assert crawler.db.groups[1]["last_video_ts"] == watermark
@@ -0,0 +1,134 @@
+import psycopg2
+import pytest
+
+from db import db_adapter
+
+
+class FakeConnection:
+    def __init__(self, alive: bool = True, schema_version=None):
+        self.alive = alive
+        self.closed = 0
+        self.pings = 0
+        self.schema_version = schema_version
+        self.statements = []
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=None):
+                conn.pings += 1
+                conn.statements.append(" ".join(sql.split()))
+                if not conn.alive:
+                    raise psycopg2.OperationalError("server closed the connection unexpectedly")
+                if "FROM crawler_schema" in sql and conn.schema_version is None:
+                    raise psycopg2.errors.UndefinedTable('relation "crawler_schema" does not exist')
+
+            def fetchone(self):
+                return (conn.schema_version,)
+
+        return Cursor()
+
+    def rollback(self):
+        pass
+
+    def commit(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, *connections):
+        self.idle = list(connections)
+        self.returned = []
+
+    def getconn(self):
+        return self.idle.pop(0)
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+        if not close:
+            self.idle.append(conn)
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    def install(*connections):
+        pool = FakePool(*connections)
+        monkeypatch.setattr(db_adapter, "_pool", pool)
+        monkeypatch.setattr(db_adapter, "_last_used", {})
+        return pool
+    return install
+
+
+def test_connections_are_reused_without_reconnecting(fake_pool):
+    conn = FakeConnection()
+    pool = fake_pool(conn)
+
+    for _ in range(3):
+        with db_adapter.connection() as c:
+            assert c is conn
+
+    # Only the first checkout of an unknown connection is pinged
+    assert conn.pings == 1
+    assert pool.returned == [(conn, False)] * 3
+
+
+def test_dead_idle_connection_is_replaced(fake_pool):
+    dead, alive = FakeConnection(alive=False), FakeConnection()
+    pool = fake_pool(dead, alive)
+
+    with db_adapter.connection() as c:
+        assert c is alive
+
+    assert (dead, True) in pool.returned
+
+
+def test_connection_broken_mid_query_is_discarded(fake_pool):
+    conn = FakeConnection()
+    pool = fake_pool(conn)
+
+    with pytest.raises(psycopg2.OperationalError):
+        with db_adapter.connection():
+            raise psycopg2.OperationalError("terminating connection")
+
+    assert pool.returned == [(conn, True)]
+
+
+def test_unreachable_database_yields_none(monkeypatch):
+    def refuse():
+        raise psycopg2.OperationalError("could not connect to server")
+
+    monkeypatch.setattr(db_adapter, "get_pool", refuse)
+
+    with db_adapter.connection() as conn:
+        assert conn is None
+
+
+def test_current_schema_runs_no_ddl(fake_pool, monkeypatch):
+    monkeypatch.setattr(db_adapter, "_schema_ready", False)
+    conn = FakeConnection(schema_version=db_adapter.SCHEMA_VERSION)
+    fake_pool(conn)
+
+    assert db_adapter.ensure_schema()
+
+    assert conn.statements[1:] == ["SELECT MAX(version) FROM crawler_schema"]
+
+
+@pytest.mark.parametrize("stored", [None, db_adapter.SCHEMA_VERSION - 1])
+def test_missing_or_old_schema_is_migrated_once(fake_pool, monkeypatch, stored):
+    monkeypatch.setattr(db_adapter, "_schema_ready", False)
+    conn = FakeConnection(schema_version=stored)
+    fake_pool(conn)
+
+    assert db_adapter.ensure_schema()
+    assert db_adapter.ensure_schema()
+
+    ddl = [sql for sql in conn.statements if sql.startswith(("CREATE", "ALTER"))]
+    assert len(ddl) == len(db_adapter.SCHEMA_STATEMENTS)
+    assert conn.statements[-1].startswith("INSERT INTO crawler_schema")
@@ -0,0 +1,77 @@
+import os
+import time
+
+import pytest
+
+from cookie_refresher import identity_paths
+from identity_pool import IdentityPool, NoIdentityAvailable, load_identity_config
+
+
+def write_cookies(name: str, expires_in: int = 30 * 86400):
+    cookies_file, _ = identity_paths(name)
+    os.makedirs(os.path.dirname(cookies_file), exist_ok=True)
+    expiry = int(time.time()) + expires_in
+    with open(cookies_file, "w", encoding="utf-8") as f:
+        f.write("# Netscape HTTP Cookie File\n\n")
+        for cookie in ("sessionid", "sid_tt", "tt_csrf_token"):
+            f.write(f".tiktok.com\tTRUE\t/\tTRUE\t{expiry}\t{cookie}\tvalue\n")
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    names = [f"{tmp_path.name}-a", f"{tmp_path.name}-b"]
+    for name in names:
+        write_cookies(name)
+
+    pool = IdentityPool()
+    cfg = load_identity_config({"identities": {
+        "enabled": True,
+        "names": names,
+        "rate_limits": {"metadata": {"rate_per_minute": 6000, "burst": 10}, "breaker": {"max_wait_seconds": 0}},
+    }})
+    pool.configure(cfg, lambda error_str: "login" in error_str)
+    return pool
+
+
+def test_requests_rotate_across_identities(pool):
+    used = []
+    for _ in range(4):
+        with pool.request("metadata") as cookies_file:
+            used.append(cookies_file)
+    assert used[0] != used[1] and used[:2] == used[2:]
+
+
+def test_throttled_identity_returns_after_cooldown(pool):
+    first, second = pool.identities
+    with pytest.raises(RuntimeError):
+        with pool.request("metadata"):
+            raise RuntimeError("HTTP Error 429: Too Many Requests")
+
+    now = time.time()
+    assert not first.is_available("metadata", now)
+    assert first.is_available("media", now)
+    with pool.request("metadata") as cookies_file:
+        assert cookies_file == second.cookies_file
+
+    first.limiter.breakers["metadata"].open_until = time.monotonic() - 1
+    assert first.is_available("metadata", time.time())
+    with pool.request("metadata") as cookies_file:
+        assert cookies_file == first.cookies_file
+    assert first.limiter.breakers["metadata"].state == "closed"
+
+
+def test_auth_errors_quarantine_identity(pool, monkeypatch):
+    monkeypatch.setattr(pool, "_start_refresh", lambda identity: None)
+    first, second = pool.identities
+    second.quarantined_until = time.time() + 3600
+
+    for _ in range(pool.cfg["auth_errors_before_quarantine"]):
+        with pytest.raises(RuntimeError):
+            with pool.request("metadata"):
+                raise RuntimeError("login required")
+
+    assert first.quarantined_until > time.time()
+    with pytest.raises(NoIdentityAvailable):
+        with pool.request("metadata"):
+            pass
@@ -0,0 +1,52 @@
+def count_consumed(crawler, monkeypatch, pinned: dict = None) -> list:
+    # Resolution is cached so only the listing itself is counted
+    tiktok = crawler.tiktok
+    crawler.db.save_sec_uid("bench_user_1", "SECbench_user_1")
+    entries = tiktok.entries
+    consumed = []
+
+    def tracked(username):
+        if pinned:
+            consumed.append(pinned)
+            yield pinned
+        for entry in entries(username):
+            consumed.append(entry)
+            yield entry
+
+    monkeypatch.setattr(tiktok, "entries", tracked)
+    return consumed
+
+
+def test_listing_stops_once_entries_are_older_than_the_watermark(crawler, monkeypatch):
+    tad, tiktok = crawler.tad, crawler.tiktok
+    tiktok.videos = 10
+    consumed = count_consumed(crawler, monkeypatch)
+    watermark = tiktok.timestamps()[2]
+
+    videos = tad.get_new_videos("bench_user_1", watermark)
+
+    assert [v["timestamp"] for v in videos] == sorted(tiktok.timestamps()[:2])
+    # 2 new entries, then MAX_PINNED + 1 old ones in a row
+    assert len(consumed) == 2 + tad.MAX_PINNED + 1
+
+
+def test_pinned_old_video_does_not_end_the_listing(crawler, monkeypatch):
+    tad, tiktok = crawler.tad, crawler.tiktok
+    tiktok.videos = 10
+    pinned = {"id": "1", "timestamp": tiktok.base_ts - 100 * 3600, "is_pinned": True, "url": "pinned"}
+    count_consumed(crawler, monkeypatch, pinned)
+
+    videos = tad.get_new_videos("bench_user_1", tiktok.timestamps()[3])
+
+    assert len(videos) == 3
+
+
+def test_first_crawl_lists_only_the_playlist_limit(crawler, monkeypatch):
+    tad, tiktok = crawler.tad, crawler.tiktok
+    tiktok.videos = tad.PLAYLIST_LIMIT + 5
+    consumed = count_consumed(crawler, monkeypatch)
+
+    [latest] = tad.get_new_videos("bench_user_1")
+
+    assert latest["timestamp"] == tiktok.timestamps()[0]
+    assert len(consumed) == tad.PLAYLIST_LIMIT
@@ -0,0 +1,72 @@
+import io
+import os
+import time
+
+import pytest
+
+from media_download import ResumingReader, cleanup_stale_parts, download_opts, load_download_config, media_id
+from transcode import load_audio_config
+
+
+class FlakyResponse:
+    def __init__(self, data: bytes, status: int, drop_after: int = None):
+        self.body = io.BytesIO(data)
+        self.status = status
+        self.headers = {"Content-Length": str(len(data))}
+        self.drop_after = drop_after
+
+    def read(self, size: int = -1) -> bytes:
+        if self.drop_after is not None and self.body.tell() >= self.drop_after:
+            raise ConnectionResetError("connection reset by peer")
+        return self.body.read(size)
+
+    def close(self):
+        pass
+
+
+def test_defaults_use_the_resumable_file_download():
+    assert load_audio_config({})["streaming"] is False
+    opts = download_opts(load_download_config({}))
+    assert opts["continuedl"] and not opts["nopart"]
+    assert opts["http_chunk_size"] == 10 * 1024 * 1024
+    assert media_id({"id": "7342"}) == "tt_7342"
+
+
+def test_reader_resumes_from_last_byte():
+    data = bytes(range(256)) * 40
+    ranges = []
+
+    def open_range(headers):
+        ranges.append(headers.get("Range"))
+        if "Range" not in headers:
+            return FlakyResponse(data, 200, drop_after=4096)
+        start = int(headers["Range"][len("bytes="):-1])
+        return FlakyResponse(data[start:], 206)
+
+    reader = ResumingReader(open_range, {}, attempts=2)
+    received = b"".join(iter(lambda: reader.read(1024), b""))
+    assert received == data
+    assert ranges == [None, "bytes=4096-"]
+
+
+def test_reader_gives_up_when_range_is_ignored():
+    data = b"x" * 5000
+
+    def open_range(headers):
+        return FlakyResponse(data, 200, drop_after=1000)
+
+    reader = ResumingReader(open_range, {}, attempts=2)
+    with pytest.raises(RuntimeError, match="ignored Range"):
+        while reader.read(500):
+            pass
+
+
+def test_cleanup_removes_only_stale_partials(tmp_path):
+    old = time.time() - 72 * 3600
+    for name in ("tt_1.mp4.part", "tt_2.mp4.ytdl", "tt_3.m4a", "tt_4.mp4.part"):
+        (tmp_path / name).write_bytes(b"x")
+    for name in ("tt_1.mp4.part", "tt_2.mp4.ytdl", "tt_3.m4a"):
+        os.utime(tmp_path / name, (old, old))
+
+    assert cleanup_stale_parts(str(tmp_path), 48) == 2
+    assert sorted(os.listdir(tmp_path)) == ["tt_3.m4a", "tt_4.mp4.part"]
@@ -0,0 +1,71 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import Metrics, metrics, start_metrics_server
+
+
+def test_render_prometheus_text():
+    m = Metrics()
+    m.inc("crawl_accounts_total", status="success")
+    m.inc("crawl_accounts_total", status="success")
+    m.observe("crawl_stage_seconds", 0.2, stage="listing")
+    m.observe("crawl_stage_seconds", 3, stage="listing")
+
+    lines = m.render().splitlines()
+
+    assert "# TYPE crawl_accounts_total counter" in lines
+    assert 'crawl_accounts_total{status="success"} 2' in lines
+    assert "# TYPE crawl_stage_seconds histogram" in lines
+    assert 'crawl_stage_seconds_bucket{stage="listing",le="0.1"} 0' in lines
+    assert 'crawl_stage_seconds_bucket{stage="listing",le="0.25"} 1' in lines
+    assert 'crawl_stage_seconds_bucket{stage="listing",le="5"} 2' in lines
+    assert 'crawl_stage_seconds_bucket{stage="listing",le="+Inf"} 2' in lines
+    assert 'crawl_stage_seconds_sum{stage="listing"} 3.200000' in lines
+    assert 'crawl_stage_seconds_count{stage="listing"} 2' in lines
+
+
+def test_spans_feed_the_stage_summary():
+    m = Metrics()
+    with m.span("db"):
+        pass
+    with pytest.raises(RuntimeError), m.span("download"):
+        raise RuntimeError("failed downloads are timed too")
+
+    assert {stage: count for stage, (count, _) in m.stage_totals().items()} == {"db": 1, "download": 1}
+
+
+def test_nested_spans_are_not_counted_twice(monkeypatch):
+    import metrics as metrics_module
+
+    clock = iter([0, 1, 4, 10, 20])
+    monkeypatch.setattr(metrics_module.time, "monotonic", lambda: next(clock))
+    m = Metrics()
+    with m.span("download"):
+        m.begin("transcode")
+        m.end("transcode")
+        # A hook that never reports "finished" is closed along with the outer span
+        m.begin("transcode")
+    m.end("transcode")
+
+    assert m.stage_totals() == {"download": (1, 7), "transcode": (2, 13)}
+
+
+def test_metrics_endpoint_serves_the_registry():
+    metrics.inc("posts_saved_total", 3)
+    server = start_metrics_server({"enabled": True, "host": "127.0.0.1", "port": 0})
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        body = urllib.request.urlopen(f"{base}/metrics", timeout=5).read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "# TYPE posts_saved_total counter" in body
+
+
+def test_disabled_metrics_start_no_server():
+    assert start_metrics_server({"enabled": False, "host": "127.0.0.1", "port": 0}) is None
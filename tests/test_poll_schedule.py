@@ -0,0 +1,82 @@
+import pytest
+
+from poll_schedule import DEFAULT_ADAPTIVE_CONFIG, next_poll_interval, plan_next_poll, update_cadence
+
+HOUR = 3600
+CFG = dict(DEFAULT_ADAPTIVE_CONFIG)
+
+
+def test_cadence_follows_the_gaps_between_posts():
+    assert update_cadence(None, HOUR, [3 * HOUR, 5 * HOUR], 0.3) == 2 * HOUR
+    assert update_cadence(2 * HOUR, 10 * HOUR, [20 * HOUR], 0.5) == 6 * HOUR
+
+
+def test_quiet_channels_back_off_up_to_the_maximum():
+    interval = None
+    for _ in range(10):
+        interval = next_poll_interval(interval, False, None, CFG)
+
+    assert interval == CFG["max_interval_minutes"] * 60
+
+
+def test_back_off_stops_at_the_posting_cadence():
+    assert next_poll_interval(3 * HOUR, False, 4 * HOUR, CFG) == 4 * HOUR
+
+
+def test_new_posts_speed_polling_up_to_the_minimum():
+    assert next_poll_interval(8 * HOUR, True, None, CFG) == 4 * HOUR
+    assert next_poll_interval(8 * HOUR, True, 3 * HOUR, CFG) == int(1.5 * HOUR)
+    assert next_poll_interval(HOUR, True, None, CFG) == CFG["min_interval_minutes"] * 60
+
+
+def test_plan_uses_the_stored_schedule():
+    group = {"poll_interval": 4 * HOUR, "post_cadence": None, "last_video_ts": HOUR}
+
+    assert plan_next_poll(group, [], CFG) == (8 * HOUR, None)
+    assert plan_next_poll(group, [11 * HOUR], CFG) == (2 * HOUR, 10 * HOUR)
+
+
+def test_crawl_schedules_accounts_and_skips_them_until_due(crawler):
+    tad, tiktok = crawler.tad, crawler.tiktok
+
+    tad.main()
+
+    # Fake posts are an hour apart, so every account is polled again at the minimum interval
+    assert all(g["poll_interval"] == HOUR and g["post_cadence"] == HOUR for g in crawler.db.groups.values())
+    listings = tiktok.requests["listing"]
+
+    tad.main()
+
+    assert tiktok.requests["listing"] == listings
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_failed_account_stays_due(crawler, monkeypatch, pipeline):
+    tad, tiktok = crawler.tad, crawler.tiktok
+    crawler.config["pipeline"] = {
+        "enabled": pipeline, "discovery_workers": 1, "download_workers": 1, "transcode_workers": 1,
+        "queue_size": 2, "report_interval_seconds": 3600,
+    }
+    download = tiktok.download
+
+    def broken(username, video_id, outtmpl, ext):
+        if username == "bench_user_1":
+            raise RuntimeError("ERROR: [TikTok] Unable to download video data: HTTP Error 503")
+        return download(username, video_id, outtmpl, ext)
+
+    monkeypatch.setattr(tiktok, "download", broken)
+
+    tad.main()
+
+    assert crawler.db.groups[1]["next_poll_at"] is None
+    assert crawler.db.groups[2]["next_poll_at"] is not None
+
+
+def test_schedules_are_kept_when_watermarks_fail_to_save(crawler, monkeypatch):
+    writer = crawler.tad.PostWriter(5)
+    writer.advance_watermark(1, "v1", 100)
+    writer.record_poll(1, HOUR, None)
+    monkeypatch.setattr(crawler.db, "update_watermarks", lambda updates: False)
+
+    assert not writer.flush()
+    assert writer.schedules == {1: (HOUR, None)}
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from rate_limiter import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, RateLimiter, is_rate_limit_error
+
+
+def test_rate_limit_error_matches_http_429_only():
+    assert is_rate_limit_error("ERROR: [TikTok] HTTP Error 429: Too Many Requests")
+    assert is_rate_limit_error("429 Too Many Requests")
+    assert not is_rate_limit_error("Unable to download video 7342942912345678901")
+    assert not is_rate_limit_error("https://www.tiktok.com/@user4290/video/1429")
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker("media", 0, 0, 0)
+    breaker.record_result(throttled=True)
+    assert breaker.state == OPEN
+
+    breaker.open_until = time.monotonic() + 60
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.open_until = time.monotonic() - 1
+    breaker.before_request()
+    assert breaker.state == HALF_OPEN and breaker.probe_in_flight
+
+    breaker.record_result(throttled=False)
+    assert breaker.state == CLOSED
+
+
+def test_limiter_trips_only_the_throttled_kind():
+    limiter = RateLimiter({"metadata": {"rate_per_minute": 6000, "burst": 10}, "breaker": {"max_wait_seconds": 0}})
+
+    with pytest.raises(RuntimeError):
+        with limiter.request("metadata"):
+            raise RuntimeError("HTTP Error 429: Too Many Requests")
+    with pytest.raises(RuntimeError):
+        with limiter.request("media"):
+            raise RuntimeError("video 4291 is private")
+
+    state = limiter.snapshot()
+    assert state["metadata"]["state"] == OPEN and state["metadata"]["throttled_total"] == 1
+    assert state["media"]["state"] == CLOSED and state["media"]["throttled_total"] == 0
@@ -0,0 +1,54 @@
+import os
+import socket
+
+import pytest
+
+import run_journal
+from cluster import load_cluster_config
+from fake_db import InMemoryDB
+from run_journal import RunJournal, load_journal_config
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = InMemoryDB([])
+    monkeypatch.setattr(run_journal, "db", fake)
+    return fake
+
+
+def test_interrupted_run_resumes_with_finished_accounts(fake_db):
+    cfg = load_journal_config({})
+    journal = RunJournal()
+    assert journal.open("host-a", cfg) == set()
+    first_run = journal.run_id
+    fake_db.record_account_results(first_run, [(1, "success", ""), (2, "skipped", ""), (3, "failed", "boom")])
+    journal.stage(4, "download")
+
+    # Process restarted before finish()
+    restarted = RunJournal()
+    assert restarted.open("host-a", cfg) == {1, 2}
+    assert restarted.run_id == first_run
+
+    restarted.finish()
+    assert restarted.open("host-a", cfg) == set() and restarted.run_id != first_run
+
+
+def test_expired_run_is_marked_interrupted(fake_db):
+    journal = RunJournal()
+    journal.open("host-a", load_journal_config({}))
+    old_run = journal.run_id
+
+    assert journal.open("host-a", load_journal_config({"journal": {"resume_window_minutes": 0}})) == set()
+    assert fake_db.runs[old_run]["status"] == "interrupted"
+
+
+def test_cluster_journal_key_survives_restarts(monkeypatch):
+    cfg = load_cluster_config({"cluster": {"enabled": True}})
+    monkeypatch.setattr(os, "getpid", lambda: 99999)
+    restarted = load_cluster_config({"cluster": {"enabled": True}})
+
+    assert cfg["journal_key"] == restarted["journal_key"] == socket.gethostname()
+    assert cfg["node_id"] != restarted["node_id"]
+
+    named = load_cluster_config({"cluster": {"node_id": "crawler-2"}})
+    assert named["journal_key"] == named["node_id"] == "crawler-2"
@@ -0,0 +1,35 @@
+import time
+
+
+def test_resolved_secuid_is_reused(crawler):
+    tad = crawler.tad
+
+    first = tad.resolve_tiktok_target("bench_user_1")
+    second = tad.resolve_tiktok_target("bench_user_1")
+
+    assert first == second == "tiktokuser:SECbench_user_1"
+    assert crawler.tiktok.requests["profile"] == 1
+
+
+def test_stale_secuid_is_resolved_again(crawler):
+    crawler.db.sec_uids["bench_user_1"] = ("SECold", time.time() - crawler.tad.SECUID_CACHE_TTL - 1)
+
+    assert crawler.tad.resolve_tiktok_target("bench_user_1") == "tiktokuser:SECbench_user_1"
+    assert crawler.tiktok.requests["profile"] == 1
+
+
+def test_failed_secuid_listing_falls_back_to_web_and_drops_the_cache(crawler, monkeypatch):
+    listing = crawler.tiktok.listing
+
+    def reject_secuid(target):
+        if target.startswith("tiktokuser:"):
+            raise RuntimeError("ERROR: [TikTok] Unable to extract secondary user ID")
+        return listing(target)
+
+    monkeypatch.setattr(crawler.tiktok, "listing", reject_secuid)
+    crawler.db.save_sec_uid("bench_user_1", "SECbench_user_1")
+
+    entries = crawler.tad.fetch_video_entries("bench_user_1")
+
+    assert len(entries) == 5
+    assert "bench_user_1" not in crawler.db.sec_uids
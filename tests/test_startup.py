@@ -0,0 +1,7 @@
+from bench_startup import measure
+
+
+def test_run_with_nothing_due_loads_no_heavy_modules():
+    result = measure(1)
+
+    assert result["loaded"] == []
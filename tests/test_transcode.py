@@ -0,0 +1,113 @@
+import io
+import os
+
+import pytest
+
+import transcode
+from transcode import audio_processor, extract_native_audio, load_audio_config, output_format, stream_to_ffmpeg
+
+
+def test_output_format_picks_container_by_codec():
+    native = load_audio_config({"audio": {"output": "native"}})
+    assert output_format(native, "aac")[0] == "m4a"
+    assert output_format(native, "mp4a.40.2")[0] == "m4a"
+    assert output_format(native, "opus")[0] == "mka"
+    assert output_format(load_audio_config({}), "aac")[0] == "mp3"
+
+
+
+def test_unknown_audio_output_is_rejected():
+    with pytest.raises(ValueError):
+        load_audio_config({"audio": {"output": "flac"}})
+
+
+def test_native_audio_is_kept_without_reencoding(ffmpeg, tmp_path):
+    ffmpeg("ok")
+    audio = tmp_path / "tt_1.m4a"
+    audio.write_bytes(b"aac")
+    video = tmp_path / "tt_2.mp4"
+    video.write_bytes(b"video")
+
+    assert audio_processor(load_audio_config({"audio": {"output": "native"}})) is extract_native_audio
+    assert extract_native_audio(str(audio)) == str(audio)
+    assert extract_native_audio(str(video)) == str(tmp_path / "tt_2.m4a")
+    assert not video.exists()
+
+def test_stream_writes_output_atomically(ffmpeg, tmp_path):
+    ffmpeg("ok")
+    dst = tmp_path / "tt_1.m4a"
+    assert stream_to_ffmpeg(io.BytesIO(b"x" * 600_000), str(dst), []) == 600_000
+    assert dst.read_bytes() == b"x" * 600_000
+    assert sorted(os.listdir(tmp_path)) == ["bin", "tt_1.m4a"]
+
+
+def test_stream_failure_leaves_no_partial_file(ffmpeg, tmp_path):
+    ffmpeg("fail")
+    with pytest.raises(RuntimeError, match="Invalid data"):
+        stream_to_ffmpeg(io.BytesIO(b"x" * 1000), str(tmp_path / "tt_1.m4a"), [])
+    assert sorted(os.listdir(tmp_path)) == ["bin"]
+
+
+def test_stream_timeout_kills_ffmpeg(ffmpeg, tmp_path, monkeypatch):
+    ffmpeg("hang")
+    monkeypatch.setattr(transcode, "FFMPEG_TIMEOUT", 0.5)
+    with pytest.raises(RuntimeError, match="timed out"):
+        stream_to_ffmpeg(io.BytesIO(b""), str(tmp_path / "tt_1.m4a"), [])
+    assert sorted(os.listdir(tmp_path)) == ["bin"]
+
+
+def test_run_ffmpeg_timeout_is_a_runtime_error(ffmpeg, tmp_path, monkeypatch):
+    ffmpeg("hang")
+    monkeypatch.setattr(transcode, "FFMPEG_TIMEOUT", 0.5)
+    src = tmp_path / "tt_1.mp4"
+    src.write_bytes(b"video")
+    with pytest.raises(RuntimeError, match="timed out"):
+        transcode.transcode_to_mp3(str(src))
+    assert src.exists() and not (tmp_path / "tt_1.mp3").exists()
+
+
+def stored_backlog(tmp_path, monkeypatch, names: tuple):
+    import tiktok_audio_downloader as tad
+    from fake_db import InMemoryDB
+
+    monkeypatch.chdir(tmp_path)
+    fake = InMemoryDB([])
+    monkeypatch.setattr(tad, "db", fake)
+    monkeypatch.setattr(tad, "audio_cfg", load_audio_config({"audio": {
+        "output": "native", "deferred_batch_size": 2, "deferred_batches_per_run": 2, "deferred_max_failures": 2,
+    }}))
+
+    os.makedirs(tad.AUDIO_DIR)
+    for name in names:
+        path = os.path.join(tad.AUDIO_DIR, f"{name}.m4a")
+        if name != "missing":
+            with open(path, "wb") as f:
+                f.write(name.encode())
+        fake.insert_yt_posts([(name, name, f"https://www.tiktok.com/@u/video/{name}", path, None)])
+    return tad, fake
+
+
+def test_backlog_skips_missing_and_repeatedly_failing_files(ffmpeg, tmp_path, monkeypatch):
+    ffmpeg("ok")
+    tad, fake = stored_backlog(tmp_path, monkeypatch, ("missing", "corrupt", "a", "b", "c"))
+
+    def pending():
+        return [os.path.basename(path) for _, path in fake.fetch_posts_without_mp3(100, max_failures=2)]
+
+    tad.run_transcode_backlog(tad.audio_cfg["deferred_batches_per_run"])
+    assert pending() == ["corrupt.m4a", "c.m4a"]
+
+    tad.run_transcode_backlog(tad.audio_cfg["deferred_batches_per_run"])
+    assert pending() == []
+    assert sorted(os.listdir(tad.AUDIO_DIR)) == ["a.mp3", "b.mp3", "c.mp3", "corrupt.m4a"]
+
+
+def test_backlog_keeps_originals_when_posts_cannot_be_repointed(ffmpeg, tmp_path, monkeypatch):
+    ffmpeg("ok")
+    tad, fake = stored_backlog(tmp_path, monkeypatch, ("a", "b"))
+    monkeypatch.setattr(fake, "update_audio_paths", lambda updates: False)
+
+    tad.run_transcode_backlog()
+
+    assert sorted(os.listdir(tad.AUDIO_DIR)) == ["a.m4a", "b.m4a"]
+    assert all(failures == 0 for failures in fake.mp3_failures.values())
@@ -0,0 +1,56 @@
+from ydl_pool import YoutubeDLPool
+
+
+class FakeHandle:
+    def __init__(self, opts: dict, cookies: str):
+        self.params = {"outtmpl": {}}
+        self.cookies = cookies
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(monkeypatch, **kwargs) -> YoutubeDLPool:
+    pool = YoutubeDLPool(**kwargs)
+    monkeypatch.setattr(pool, "_create", FakeHandle)
+    return pool
+
+
+def test_handles_are_reused_per_profile(monkeypatch):
+    pool = make_pool(monkeypatch)
+    opts = {"quiet": True, "extract_flat": True}
+
+    with pool.acquire(dict(opts, outtmpl="a.%(ext)s")) as first:
+        assert first.params["outtmpl"]["default"] == "a.%(ext)s"
+    with pool.acquire(dict(opts, outtmpl="b.%(ext)s")) as second:
+        assert second.params["outtmpl"]["default"] == "b.%(ext)s"
+    with pool.acquire(opts, cookies="other.txt") as third:
+        pass
+
+    assert second is first and third is not first
+    assert pool.stats() == {"idle": 2, "profiles": 2, "created": 2, "reused": 1}
+
+
+def test_concurrent_checkouts_get_separate_handles(monkeypatch):
+    pool = make_pool(monkeypatch, max_idle=1)
+
+    with pool.acquire({}) as first, pool.acquire({}) as second:
+        assert first is not second
+
+    # Only max_idle handles are kept; the rest are closed on release
+    assert pool.stats()["idle"] == 1
+    assert first.closed != second.closed
+
+
+def test_recycle_drops_idle_and_checked_out_handles(monkeypatch):
+    pool = make_pool(monkeypatch)
+    with pool.acquire({}) as idle:
+        pass
+
+    with pool.acquire({"quiet": True}) as busy:
+        pool.recycle()
+        assert idle.closed and not busy.closed
+
+    assert busy.closed
+    assert pool.stats()["idle"] == 0
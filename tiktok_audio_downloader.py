@@ -3,17 +3,28 @@ import sys
 import json
 import time
 import random
-import subprocess
+import socket
 import traceback
 import logging
-
-import yt_dlp
-from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.date import DateTrigger
+import threading
+import itertools
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 from db import db_adapter as db
+from api_health import StrategyHealth, is_host_failure
+from poll_schedule import load_adaptive_config, plan_next_poll
+from rate_limiter import CircuitOpenError, RateLimiter, is_rate_limit_error
+from pipeline import StagedPipeline, load_pipeline_config
+from transcode import audio_processor, convert_to_mp3, load_audio_config, output_format, stream_to_ffmpeg
+from ydl_pool import ydl_pool
+from cluster import NodeHeartbeat, load_cluster_config
+from identity_pool import IdentityPool, NoIdentityAvailable, load_identity_config
+from run_journal import RunJournal, load_journal_config, log_run_history
+from metrics import metrics, load_metrics_config, start_metrics_server
+from audio_store import file_digest, load_storage_config, store_blob
+from audio_retention import AudioIndex, enforce_retention, load_retention_config
+from media_download import ResumingReader, cleanup_stale_parts, download_opts, load_download_config, media_id
 
 AUDIO_DIR = "downloads/audio"
 COOKIES_DIR = "cookies"
@@ -22,34 +33,58 @@ CONFIG_FILE = "scheduler_config.json"
 
 DELAY_MIN = 40
 DELAY_MAX = 50
-RATE_LIMIT_DELAY_MIN = 300
-RATE_LIMIT_DELAY_MAX = 900
 PLAYLIST_LIMIT = 10
+MAX_PINNED = 3
+SECUID_CACHE_TTL = 7 * 86400
+DEFAULT_CONCURRENCY = 1
+DEFAULT_DB_BATCH_SIZE = 20
+REFRESH_RETRY_SECONDS = 900
 
 AUTH_ERROR_KEYWORDS = ["private", "login", "sign in", "auth", "embedding disabled", "comfortable"]
 LIVESTREAM_KEYWORDS = ["livestream", "live stream", "đang live", "live now"]
 
 auth_error_count = 0
+cookies_generation = 0
+background_refresh = None
+next_background_refresh = 0.0
+state_lock = threading.Lock()
+refresh_lock = threading.Lock()
+adaptive_cfg = load_adaptive_config({})
+audio_cfg = load_audio_config({})
+storage_cfg = load_storage_config({})
+download_cfg = load_download_config({})
+retention_cfg = load_retention_config({})
+limiter = RateLimiter()
+api_health = StrategyHealth()
+identities = IdentityPool()
+journal = RunJournal()
+audio_index = AudioIndex()
+async_engine = None
 
 try:
-    from cookie_refresher import auto_refresh_if_needed, PLAYWRIGHT_AVAILABLE
+    from cookie_refresher import auto_refresh_if_needed, cookie_state, PLAYWRIGHT_AVAILABLE
     COOKIE_REFRESH_ENABLED = PLAYWRIGHT_AVAILABLE
 except ImportError:
     COOKIE_REFRESH_ENABLED = False
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler("tiktok_crawl.log", encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-logging.getLogger("yt_dlp").setLevel(logging.WARNING)
+
+
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] [%(threadName)s] %(message)s',
+        handlers=[
+            logging.FileHandler("tiktok_crawl.log", encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    logging.getLogger("yt_dlp").setLevel(logging.WARNING)
 
 
 def get_cookies_file():
     if os.path.exists(COOKIES_FILE):
+        if COOKIE_REFRESH_ENABLED and cookie_state(COOKIES_FILE).needs_refresh():
+            refresh_in_background()
         return COOKIES_FILE
 
     if COOKIE_REFRESH_ENABLED:
@@ -64,23 +99,58 @@ def get_cookies_file():
     return None
 
 
-def try_refresh_cookies():
-    global auth_error_count
+def refresh_in_background():
+    global background_refresh, next_background_refresh
+
+    with state_lock:
+        if time.time() < next_background_refresh:
+            return
+        if background_refresh is not None and background_refresh.is_alive():
+            return
+        next_background_refresh = time.time() + REFRESH_RETRY_SECONDS
+        background_refresh = threading.Thread(
+            target=try_refresh_cookies, kwargs={"interactive": False}, name="cookie-refresh", daemon=True
+        )
+        background_refresh.start()
+
+    logging.info("🔄 Auth cookies expire soon, refreshing in background...")
+
+
+def try_refresh_cookies(interactive: bool = True):
+    global auth_error_count, cookies_generation
     if not COOKIE_REFRESH_ENABLED:
         return False
 
-    try:
-        logging.info("🔄 Refreshing cookies...")
-        new_cookies = auto_refresh_if_needed(force=True)
-        if new_cookies and os.path.exists(COOKIES_FILE):
-            auth_error_count = 0
-            logging.info("✅ Cookie refresh successful")
-            return True
-    except Exception as e:
-        logging.error(f"❌ Cookie refresh failed: {e}")
+    generation = cookies_generation
+    with refresh_lock:
+        # Another worker refreshed while we were waiting for the lock
+        if cookies_generation != generation:
+            return os.path.exists(COOKIES_FILE)
+
+        try:
+            logging.info("🔄 Refreshing cookies...")
+            new_cookies = auto_refresh_if_needed(force=True, interactive=interactive)
+            if new_cookies and os.path.exists(COOKIES_FILE):
+                with state_lock:
+                    auth_error_count = 0
+                cookies_generation += 1
+                ydl_pool.recycle()
+                metrics.inc("cookie_refreshes_total", result="ok", identity="default")
+                logging.info("✅ Cookie refresh successful")
+                return True
+        except Exception as e:
+            logging.error(f"❌ Cookie refresh failed: {e}")
+    metrics.inc("cookie_refreshes_total", result="failed", identity="default")
     return False
 
 
+@contextmanager
+def session(kind: str):
+    # Global budget first (shared IP), then the budget of whichever identity is picked
+    with limiter.request(kind), identities.request(kind) as cookies:
+        yield cookies or get_cookies_file()
+
+
 def load_config():
     config_path = os.path.join(os.path.dirname(__file__), CONFIG_FILE)
     with open(config_path, "r", encoding="utf-8") as f:
@@ -89,18 +159,33 @@ def load_config():
 
 def build_api_configs():
     return [
-        {"tiktok": {"api_hostname": "api16-normal-c-useast1a.tiktokv.com", "skip": "web"}},
-        {"tiktok": {"api_hostname": "api22-normal-c-useast1a.tiktokv.com", "skip": "web"}},
-        {"tiktok": {"api_hostname": "api.tiktokv.com"}},
-        {},
+        ("api16", {"tiktok": {"api_hostname": "api16-normal-c-useast1a.tiktokv.com", "skip": "web"}}),
+        ("api22", {"tiktok": {"api_hostname": "api22-normal-c-useast1a.tiktokv.com", "skip": "web"}}),
+        ("api", {"tiktok": {"api_hostname": "api.tiktokv.com"}}),
+        ("default", {}),
     ]
 
 
-def resolve_tiktok_target(username: str) -> str:
+def is_throttle_error(error: Exception) -> bool:
+    return isinstance(error, (CircuitOpenError, NoIdentityAvailable)) or is_rate_limit_error(str(error))
+
+
+def resolve_tiktok_target(username: str, resolve: bool = True) -> str:
     profile_url = f"https://www.tiktok.com/@{username}"
+
+    cached = db.get_cached_sec_uid(username, SECUID_CACHE_TTL)
+    if cached:
+        return f"tiktokuser:{cached}"
+    if not resolve:
+        return profile_url
+
     logging.info(f"🔍 Resolving secUid for @{username}")
 
-    for idx, extractor_args in enumerate(build_api_configs(), 1):
+    api_configs = dict(build_api_configs())
+
+    # The hostnames are ranked against each other on resolution alone
+    for strategy in api_health.order(list(api_configs)):
+        extractor_args = api_configs[strategy]
         ydl_opts = {
             "quiet": True,
             "extract_flat": True,
@@ -112,21 +197,27 @@ def resolve_tiktok_target(username: str) -> str:
         if extractor_args:
             ydl_opts["extractor_args"] = extractor_args
 
-        cookies = get_cookies_file()
-        if cookies:
-            ydl_opts["cookies"] = cookies
-
+        started = time.monotonic()
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(profile_url, download=False)
-                entries = info.get("entries", [])
-                if entries:
-                    sec_uid = entries[0].get("uploader_id") or entries[0].get("channel_id")
-                    if sec_uid:
-                        return f"tiktokuser:{sec_uid}"
-        except Exception:
+            with session("metadata") as cookies:
+                started = time.monotonic()
+                with metrics.span("resolve"), ydl_pool.acquire(ydl_opts, cookies) as ydl:
+                    info = ydl.extract_info(profile_url, download=False)
+        except Exception as e:
+            if is_host_failure(e):
+                api_health.record(strategy, False, time.monotonic() - started)
+            if is_throttle_error(e):
+                raise
             continue
 
+        api_health.record(strategy, True, time.monotonic() - started)
+        entries = info.get("entries", [])
+        if entries:
+            sec_uid = entries[0].get("uploader_id") or entries[0].get("channel_id")
+            if sec_uid:
+                db.save_sec_uid(username, sec_uid)
+                return f"tiktokuser:{sec_uid}"
+
     logging.warning(f"⚠️ Could not get secUid for @{username}, using web fallback")
     return profile_url
 
@@ -152,40 +243,13 @@ def filter_videos(entries: list) -> list:
     return [e for e in entries if e and not is_livestream(e)]
 
 
-def get_latest_video_subprocess(username: str, cookies_file: str) -> list:
-    cmd = [
-        "yt-dlp",
-        "--cookies", cookies_file,
-        "--skip-download",
-        "--dump-json",
-        "--flat-playlist",
-        "--playlist-items", f"1-{PLAYLIST_LIMIT}",
-        "--extractor-args", "tiktok:skip=api",
-        f"https://www.tiktok.com/@{username}"
-    ]
-
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-    if result.returncode != 0:
-        raise RuntimeError(f"yt-dlp subprocess failed: {result.stderr[:200]}")
-
-    entries = []
-    for line in result.stdout.strip().split("\n"):
-        if line.strip():
-            try:
-                entries.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
-
-    return filter_videos(entries)
-
-
-def build_ydl_opts(target: str, cookies: str) -> dict:
+def build_ydl_opts(target: str, limit: int = PLAYLIST_LIMIT) -> dict:
     ydl_opts = {
         "quiet": True,
         "extract_flat": True,
         "skip_download": True,
-        "playlistend": PLAYLIST_LIMIT,
-        "playlist_items": f"1-{PLAYLIST_LIMIT}",
+        "playlistend": limit,
+        "playlist_items": f"1-{limit}",
         "no_warnings": True,
     }
 
@@ -194,9 +258,6 @@ def build_ydl_opts(target: str, cookies: str) -> dict:
     else:
         ydl_opts["extractor_args"] = {"tiktok": {"skip": "api"}}
 
-    if cookies:
-        ydl_opts["cookies"] = cookies
-
     return ydl_opts
 
 
@@ -207,172 +268,468 @@ def find_latest_video(entries: list):
     return None
 
 
-def get_latest_video_url(username: str):
-    target = resolve_tiktok_target(username)
-    cookies = get_cookies_file()
-    ydl_opts = build_ydl_opts(target, cookies)
+def build_video_url(username: str, video_id: str) -> str:
+    return f"https://www.tiktok.com/@{username}/video/{video_id}"
 
-    last_error = "No video found"
 
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(target, download=False)
-            entries = filter_videos(info.get("entries", []))
+def dated_videos(entries: list) -> list:
+    return [e for e in entries if e.get("timestamp") and not e.get("is_pinned")]
 
-        latest = find_latest_video(entries)
-        if latest:
-            video_url = f"https://www.tiktok.com/@{username}/video/{latest['id']}"
-            return video_url, latest.get("title", ""), False
 
-    except Exception as e:
-        last_error = str(e)
-        logging.warning(f"⚠️ Primary method failed: {last_error[:100]}, trying subprocess...")
+def stream_entries(ydl, url: str, limit: int):
+    # process=False hands back the extractor's lazy page generator, so entries
+    # are consumed as each page arrives and iteration can stop early
+    info = ydl.extract_info(url, download=False, process=False)
+    if info.get("_type") in ("url", "url_transparent"):
+        info = ydl.extract_info(url, download=False)
+
+    yield from itertools.islice(info.get("entries") or [], limit)
+
+
+def list_entries(target: str, cookies: str, limit: int, stop_before_ts=None) -> list:
+    entries = []
+    old_streak = 0
+
+    with ydl_pool.acquire(build_ydl_opts(target, limit), cookies) as ydl:
+        for entry in stream_entries(ydl, target, limit):
+            entries.append(entry)
+            if stop_before_ts is None or entry.get("is_pinned") or not entry.get("timestamp"):
+                continue
+
+            # Pinned videos may not be flagged, so only stop once more old
+            # entries than the pin limit have been seen in a row
+            old_streak = old_streak + 1 if entry["timestamp"] <= stop_before_ts else 0
+            if old_streak > MAX_PINNED:
+                break
+
+    return filter_videos(entries)
+
 
-    if cookies:
+def fetch_video_entries(username: str, limit: int = PLAYLIST_LIMIT, stop_before_ts=None) -> list:
+    profile_url = f"https://www.tiktok.com/@{username}"
+    listing_order = api_health.order(["secuid", "web"])
+    # Resolving costs a request, so it is only done while secUid listing goes first
+    target = resolve_tiktok_target(username, resolve=listing_order[0] == "secuid")
+
+    strategies = {}
+    if target.startswith("tiktokuser:"):
+        strategies["secuid"] = target
+    strategies["web"] = profile_url
+
+    # A quarantined strategy is still the last resort when nothing else is left
+    ordered = [s for s in listing_order if s in strategies] + [s for s in strategies if s not in listing_order]
+    last_error = "No video found"
+
+    for strategy in ordered:
+        started = time.monotonic()
         try:
-            entries = get_latest_video_subprocess(username, cookies)
-            latest = find_latest_video(entries)
-            if latest:
-                video_url = f"https://www.tiktok.com/@{username}/video/{latest['id']}"
-                return video_url, latest.get("title", ""), True
+            with session("metadata") as cookies, metrics.span("listing"):
+                started = time.monotonic()
+                entries = list_entries(strategies[strategy], cookies, limit, stop_before_ts)
         except Exception as e:
             last_error = str(e)
-            logging.error(f"❌ Subprocess also failed: {last_error[:100]}")
+            if is_host_failure(e):
+                api_health.record(strategy, False, time.monotonic() - started)
+            if is_throttle_error(e):
+                raise
+            logging.warning(f"⚠️ Listing via {strategy} failed: {last_error[:100]}")
+            if strategy == "secuid":
+                db.invalidate_sec_uid(username)
+            continue
+
+        api_health.record(strategy, True, time.monotonic() - started)
+        if dated_videos(entries):
+            return entries
 
     raise RuntimeError(f"Could not get video for @{username}: {last_error[:150]}")
 
 
-def download_audio_subprocess(video_url: str, video_id: str, cookies_file: str) -> str:
-    os.makedirs(AUDIO_DIR, exist_ok=True)
-    output_template = os.path.join(AUDIO_DIR, f"{video_id}.%(ext)s")
-
-    cmd = [
-        "yt-dlp",
-        "--cookies", cookies_file,
-        "-f", "bestaudio/best",
-        "-x", "--audio-format", "mp3",
-        "--audio-quality", "192K",
-        "-o", output_template,
-        video_url
-    ]
+def get_new_videos(username: str, last_video_ts=None) -> list:
+    if last_video_ts is None:
+        return [find_latest_video(fetch_video_entries(username, PLAYLIST_LIMIT))]
 
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-    if result.returncode != 0:
-        raise RuntimeError(f"Download failed: {result.stderr[:200]}")
+    # Listing streams newest first, so channels with nothing new stop after the first few entries
+    entries = fetch_video_entries(username, PLAYLIST_LIMIT, stop_before_ts=last_video_ts)
+    newer = [e for e in dated_videos(entries) if e["timestamp"] > last_video_ts]
+    return sorted(newer, key=lambda e: e["timestamp"])
 
-    return os.path.join(AUDIO_DIR, f"{video_id}.mp3")
 
+def downloaded_path(info: dict, video_url: str) -> str:
+    downloads = info.get("requested_downloads") or []
+    if downloads and downloads[-1].get("filepath"):
+        return downloads[-1]["filepath"]
+    raise RuntimeError(f"Download finished without reporting a file for {video_url}")
 
-def download_audio(video_url: str, video_id: str, use_subprocess: bool = False) -> str:
-    os.makedirs(AUDIO_DIR, exist_ok=True)
-    cookies = get_cookies_file()
 
-    if use_subprocess:
-        if not cookies:
-            raise RuntimeError("Cookies required for subprocess download")
-        return download_audio_subprocess(video_url, video_id, cookies)
+def build_audio_postprocessor() -> dict:
+    if audio_cfg["output"] == "native":
+        # "best" keeps the source codec and only remuxes (AAC -> .m4a)
+        return {"key": "FFmpegExtractAudio", "preferredcodec": "best"}
 
-    ydl_opts = {
+    return {
+        "key": "FFmpegExtractAudio",
+        "preferredcodec": "mp3",
+        "preferredquality": audio_cfg["mp3_quality"],
+    }
+
+
+def media_ydl_opts(video_id: str) -> dict:
+    return {
         "format": "bestaudio/best[acodec!=none]/best",
         "outtmpl": os.path.join(AUDIO_DIR, f"{video_id}.%(ext)s"),
         "nocheckcertificate": True,
-        "postprocessors": [{
-            "key": "FFmpegExtractAudio",
-            "preferredcodec": "mp3",
-            "preferredquality": "192",
-        }],
         "quiet": False,
         "no_warnings": True,
+        **download_opts(download_cfg),
     }
 
-    if cookies:
-        ydl_opts["cookies"] = cookies
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([video_url])
+def stream_audio(video_url: str, video_id: str):
+    from yt_dlp.networking import Request
+
+    with session("media") as cookies, metrics.span("download"), \
+            ydl_pool.acquire(media_ydl_opts(video_id), cookies) as ydl:
+        info = ydl.extract_info(video_url, download=False)
+        # Formats yt-dlp would merge from separate streams can't be piped as one input
+        if info.get("requested_formats") or not info.get("url"):
+            return None
+
+        ext, codec_args = output_format(audio_cfg, info.get("acodec"))
+        path = os.path.join(AUDIO_DIR, f"{video_id}.{ext}")
+        reader = ResumingReader(
+            lambda headers: ydl.urlopen(Request(info["url"], headers=headers)),
+            info.get("http_headers") or {}, int(download_cfg["stream_resume_attempts"]),
+        )
+        try:
+            size = stream_to_ffmpeg(reader, path, codec_args)
+        except RuntimeError as e:
+            # e.g. an MP4 with its index at the end can't be demuxed from a pipe
+            logging.warning(f"⚠️ Streaming failed for {video_url}, downloading the file instead: {str(e)[:100]}")
+            return None
+        finally:
+            reader.close()
+
+    metrics.inc("download_bytes_total", size)
+    return path
+
 
-    return os.path.join(AUDIO_DIR, f"{video_id}.mp3")
+def time_postprocessing(progress: dict):
+    # yt-dlp runs its ffmpeg postprocessors inside the download call; this splits them out
+    if progress["status"] == "started":
+        metrics.begin("transcode")
+    elif progress["status"] == "finished":
+        metrics.end("transcode")
+
+
+def download_audio(video_url: str, video_id: str, extract_audio: bool = True) -> str:
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+
+    if extract_audio and audio_cfg["streaming"]:
+        path = stream_audio(video_url, video_id)
+        if path:
+            return path
+
+    ydl_opts = media_ydl_opts(video_id)
+
+    if extract_audio:
+        ydl_opts["postprocessors"] = [build_audio_postprocessor()]
+        ydl_opts["postprocessor_hooks"] = [time_postprocessing]
+
+    with session("media") as cookies, metrics.span("download"), ydl_pool.acquire(ydl_opts, cookies) as ydl:
+        info = ydl.extract_info(video_url, download=True)
+
+    path = downloaded_path(info, video_url)
+    metrics.inc("download_bytes_total", os.path.getsize(path))
+    return path
+
+
+def store_audio(path: str) -> tuple:
+    if not storage_cfg["content_addressed"]:
+        audio_index.record(path, os.path.getsize(path))
+        return None, path
+
+    with metrics.span("store"):
+        size = os.path.getsize(path)
+        digest = file_digest(path)
+        # The blob may have moved since it was stored (MP3 backlog, archive), so the DB is
+        # asked where this content lives before falling back to its default location
+        known_path = db.get_blob_path(digest)
+        if known_path and os.path.exists(known_path):
+            os.remove(path)
+            audio_index.touch(known_path)
+            logging.info(f"♻️ Same audio already stored as {known_path}")
+            return digest, known_path
+
+        digest, blob_path, created = store_blob(path, digest)
+        db.save_audio_blob(digest, blob_path, size)
+
+    if created:
+        audio_index.record(blob_path, size)
+    else:
+        audio_index.touch(blob_path)
+        logging.info(f"♻️ Same audio already stored as {blob_path}")
+    return digest, blob_path
 
 
 def is_auth_error(error_str: str) -> bool:
     return any(kw in error_str.lower() for kw in AUTH_ERROR_KEYWORDS)
 
 
+def pick_delay(min_sec: int = DELAY_MIN, max_sec: int = DELAY_MAX) -> int:
+    return random.randint(min_sec, max_sec)
+
+
 def random_delay(min_sec: int = DELAY_MIN, max_sec: int = DELAY_MAX):
-    delay = random.randint(min_sec, max_sec)
+    delay = pick_delay(min_sec, max_sec)
     logging.info(f"⏳ Waiting {delay}s...")
-    time.sleep(delay)
+    with metrics.span("delay"):
+        time.sleep(delay)
+
+
+class PostWriter:
+    def __init__(self, batch_size: int = DEFAULT_DB_BATCH_SIZE):
+        self.known_urls = set()
+        self.checked_urls = set()
+        self.batch_size = max(1, batch_size)
+        self.pending = []
+        self.watermarks = {}
+        self.schedules = {}
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def find_known(self, urls: list) -> set:
+        # Callers pass every candidate URL of a discovery round at once, so the check is one
+        # index probe per round; later calls for the same URLs are answered from memory
+        with self.lock:
+            unchecked = list(dict.fromkeys(url for url in urls if url not in self.checked_urls))
+        if unchecked:
+            with metrics.span("db"):
+                found = db.get_known_urls(unchecked)
+            with self.lock:
+                self.known_urls.update(found)
+                self.checked_urls.update(unchecked)
+        with self.lock:
+            return {url for url in urls if url in self.known_urls}
+
+    def add(self, video_id: str, title: str, url: str, audio_path: str, audio_sha256: str = None):
+        with self.lock:
+            self.known_urls.add(url)
+            self.checked_urls.add(url)
+            self.pending.append((video_id, title, url, audio_path, audio_sha256))
+            should_flush = len(self.pending) >= self.batch_size
+
+        if should_flush:
+            self.flush()
+
+    def advance_watermark(self, group_id: int, video_id: str, video_ts: int):
+        with self.lock:
+            current = self.watermarks.get(group_id)
+            if current is None or video_ts > current[1]:
+                self.watermarks[group_id] = (video_id, video_ts)
+
+    def record_account(self, group_id: int, status: str, detail: str):
+        if journal.run_id is None:
+            return
+        with self.lock:
+            self.results[group_id] = (status, detail)
+
+    def record_poll(self, group_id: int, poll_interval: int, post_cadence):
+        with self.lock:
+            self.schedules[group_id] = (poll_interval, post_cadence)
+
+    def flush(self) -> bool:
+        with self.lock:
+            rows, self.pending = self.pending, []
+            watermarks, self.watermarks = self.watermarks, {}
+            schedules, self.schedules = self.schedules, {}
+            results, self.results = self.results, {}
+
+        with metrics.span("db"):
+            return self._write(rows, watermarks, schedules, results)
+
+    def _write(self, rows: list, watermarks: dict, schedules: dict, results: dict) -> bool:
+        # Watermarks are only written once the posts behind them are saved
+        if rows and not db.insert_yt_posts(rows):
+            logging.error(f"❌ Could not save {len(rows)} post(s), will retry on next flush")
+            with self.lock:
+                self.pending = rows + self.pending
+            for group_id, (video_id, video_ts) in watermarks.items():
+                self.advance_watermark(group_id, video_id, video_ts)
+            with self.lock:
+                self.schedules = {**schedules, **self.schedules}
+                self.results = {**results, **self.results}
+            return False
+
+        if rows:
+            metrics.inc("posts_saved_total", len(rows))
+            logging.info(f"💾 Saved {len(rows)} post(s) to database")
+
+        updates = [(group_id, video_id, video_ts) for group_id, (video_id, video_ts) in watermarks.items()]
+        if updates and not db.update_watermarks(updates):
+            logging.error(f"❌ Could not save {len(updates)} watermark(s), will retry on next flush")
+            for group_id, video_id, video_ts in updates:
+                self.advance_watermark(group_id, video_id, video_ts)
+            with self.lock:
+                self.schedules = {**schedules, **self.schedules}
+                self.results = {**results, **self.results}
+            return False
+
+        schedule_rows = [(group_id, interval, cadence) for group_id, (interval, cadence) in schedules.items()]
+        if schedule_rows and not db.update_poll_schedules(schedule_rows):
+            logging.warning(f"⚠️ Could not save {len(schedule_rows)} poll schedule(s)")
+
+        # Accounts are only checkpointed as done after everything they produced is saved
+        result_rows = [(group_id, status, detail) for group_id, (status, detail) in results.items()]
+        if result_rows and not db.record_account_results(journal.run_id, result_rows):
+            logging.warning(f"⚠️ Could not journal {len(result_rows)} account result(s)")
+
+        return True
+
+
+def schedule_next_poll(group: dict, videos: list, writer: PostWriter):
+    if not adaptive_cfg["enabled"]:
+        return
 
+    interval, cadence = plan_next_poll(group, [e["timestamp"] for e in videos], adaptive_cfg)
+    writer.record_poll(group["id"], interval, cadence)
+    logging.info(f"🗓️ @{group['tt_link']} next poll in {interval // 60} min")
 
-def process_single_account(username: str, name: str) -> tuple:
+
+def download_new_videos(username: str, group: dict, writer: PostWriter, videos: list = None) -> tuple:
     global auth_error_count
 
-    username = username.replace("@", "")
-    logging.info(f"\n🎵 Processing: {name} (@{username})")
-    random_delay()
+    if videos is None:
+        videos = get_new_videos(username, group.get("last_video_ts"))
 
-    try:
-        video_url, title, used_subprocess = get_latest_video_url(username)
+    # The next poll is only pushed out once the account's work succeeded, so a failed
+    # account stays due and is retried on the next tick
+    if not videos:
+        schedule_next_poll(group, videos, writer)
+        logging.info(f"⏭️ No new videos for @{username}, skipping")
+        return "skipped", "No new videos"
 
-        if not db.validate_yt_post(title, video_url):
-            logging.info("⏭️ Already exists, skipping")
-            return "skipped", "Already exists"
+    known = writer.find_known([build_video_url(username, entry["id"]) for entry in videos])
+    saved_titles = []
+    for entry in videos:
+        video_url = build_video_url(username, entry["id"])
+        title = entry.get("title", "")
 
-        video_id_db = f"t_{username}_{int(time.time())}"
-        audio_path = download_audio(video_url, video_id_db, use_subprocess=used_subprocess)
-        db.insert_yt_post(video_id_db, title, video_url, audio_path)
+        if video_url in known:
+            logging.info(f"⏭️ Already exists, skipping: {video_url}")
+        else:
+            video_id_db = f"t_{username}_{entry['timestamp']}"
+            digest, audio_path = store_audio(download_audio(video_url, media_id(entry)))
+            writer.add(video_id_db, title, video_url, audio_path, digest)
+            saved_titles.append(title)
+            logging.info(f"✅ Success: {audio_path}")
 
-        logging.info(f"✅ Success: {audio_path}")
+        writer.advance_watermark(group["id"], entry["id"], entry["timestamp"])
+
+    schedule_next_poll(group, videos, writer)
+    if not saved_titles:
+        return "skipped", "Already exists"
+
+    with state_lock:
         auth_error_count = 0
-        return "success", title[:50]
 
+    if len(saved_titles) == 1:
+        return "success", saved_titles[0][:50]
+    return "success", f"{len(saved_titles)} videos, latest: {saved_titles[-1][:40]}"
+
+
+def list_account(group: dict, wait: bool = True):
+    # A listing error is handed back so finish_account can handle it like any other
+    username = group["tt_link"].replace("@", "")
+    logging.info(f"\n🎵 Processing: {group['tt_name']} (@{username})")
+    journal.stage(group["id"], "crawl")
+    if wait:
+        random_delay()
+
+    try:
+        return get_new_videos(username, group.get("last_video_ts"))
     except Exception as e:
-        return handle_error(username, name, e)
+        return e
 
 
-def handle_error(username: str, name: str, error: Exception) -> tuple:
-    global auth_error_count
+def check_known(groups: list, listings: dict, writer: PostWriter):
+    # One lookup for the candidate URLs of every account listed in this round
+    urls = []
+    for group in groups:
+        videos = listings.get(group["id"])
+        if isinstance(videos, list):
+            username = group["tt_link"].replace("@", "")
+            urls.extend(build_video_url(username, entry["id"]) for entry in videos)
+    writer.find_known(urls)
+
+
+def finish_account(group: dict, writer: PostWriter, listing) -> tuple:
+    if isinstance(listing, Exception):
+        return handle_error(group, listing, writer)
+
+    try:
+        return download_new_videos(group["tt_link"].replace("@", ""), group, writer, listing)
+    except Exception as e:
+        return handle_error(group, e, writer)
+
+
+def process_single_account(group: dict, writer: PostWriter, wait: bool = True) -> tuple:
+    return finish_account(group, writer, list_account(group, wait))
+
 
+def handle_error(group: dict, error: Exception, writer: PostWriter) -> tuple:
+    username = group["tt_link"].replace("@", "")
     error_str = str(error)
     logging.error(f"❌ Error for {username}: {error_str[:100]}")
     traceback.print_exc()
 
-    if is_auth_error(error_str):
+    if recover_from_auth_error(error_str):
+        retry_result = retry_account(group, writer)
+        if retry_result:
+            return retry_result
+
+    return classify_error(error)
+
+
+def recover_from_auth_error(error_str: str) -> bool:
+    global auth_error_count
+
+    if not is_auth_error(error_str):
+        return False
+
+    if identities.enabled:
+        # The failing identity was quarantined by the pool; retry on another one
+        return identities.has_available()
+
+    with state_lock:
         auth_error_count += 1
-        logging.warning(f"⚠️ Auth error #{auth_error_count}")
+        count = auth_error_count
+    logging.warning(f"⚠️ Auth error #{count}")
+
+    return try_refresh_cookies()
 
-        if try_refresh_cookies():
-            retry_result = retry_account(username, name)
-            if retry_result:
-                return retry_result
+
+def classify_error(error: Exception) -> tuple:
+    error_str = str(error)
 
     if "Unable to extract secondary user ID" in error_str:
         return "skipped", "Possibly livestream/private"
-    elif "429" in error_str or "Too Many Requests" in error_str:
-        wait = random.randint(RATE_LIMIT_DELAY_MIN, RATE_LIMIT_DELAY_MAX)
-        logging.warning(f"⚠️ Rate limited, waiting {wait // 60} minutes...")
-        time.sleep(wait)
+    elif is_throttle_error(error):
+        # The circuit breaker pauses further requests; this worker moves on
         return "failed", "Rate limited"
 
     return "failed", error_str[:80]
 
 
-def retry_account(username: str, name: str) -> tuple:
+def retry_account(group: dict, writer: PostWriter) -> tuple:
+    username = group["tt_link"].replace("@", "")
     logging.info(f"🔄 Retrying @{username} after cookie refresh...")
     time.sleep(random.randint(10, 20))
 
     try:
-        video_url, title, used_subprocess = get_latest_video_url(username)
-
-        if not db.validate_yt_post(title, video_url):
-            return "skipped", "Already exists"
-
-        video_id_db = f"t_{username}_{int(time.time())}"
-        audio_path = download_audio(video_url, video_id_db, use_subprocess=used_subprocess)
-        db.insert_yt_post(video_id_db, title, video_url, audio_path)
-
-        logging.info(f"✅ Retry successful: {audio_path}")
-        return "success", title[:50]
+        status, detail = download_new_videos(username, group, writer)
+        if status == "success":
+            logging.info(f"✅ Retry successful: {detail}")
+        return status, detail
 
     except Exception as e:
         logging.error(f"❌ Retry also failed: {str(e)[:100]}")
@@ -397,31 +754,431 @@ def log_summary(success_list: list, skipped_list: list, failed_list: list):
         logging.info(f"  - @{u} ({n}): {err}")
 
 
+def get_concurrency(config: dict) -> int:
+    crawler_cfg = config.get("crawler", {})
+    return max(1, int(crawler_cfg.get("concurrency", DEFAULT_CONCURRENCY)))
+
+
+def crawl_account(group: dict, writer: PostWriter, listing) -> tuple:
+    # Politeness delays run inside the worker, so they only hold back this
+    # worker's next account instead of the whole process.
+    try:
+        return finish_account(group, writer, listing)
+    finally:
+        random_delay(DELAY_MIN, DELAY_MAX + 30)
+
+
+def failure_category(detail: str) -> str:
+    if detail == "Rate limited":
+        return "rate_limited"
+    if is_auth_error(detail):
+        return "auth"
+    if "timed out" in detail.lower() or "timeout" in detail.lower():
+        return "timeout"
+    return "other"
+
+
+def record_result(results: tuple, group: dict, status: str, detail: str):
+    success_list, skipped_list, failed_list = results
+    entry = (group["tt_link"], group["tt_name"], detail)
+
+    metrics.inc("crawl_accounts_total", status=status)
+    if status not in ("success", "skipped"):
+        metrics.inc("crawl_failures_total", category=failure_category(detail))
+
+    if status == "success":
+        success_list.append(entry)
+    elif status == "skipped":
+        skipped_list.append(entry)
+    else:
+        failed_list.append(entry)
+
+
+def run_worker_pool(groups: list, writer: PostWriter, concurrency: int) -> tuple:
+    results = ([], [], [])
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crawl") as pool:
+        # Every account is listed first, so known URLs are checked in one query for the round
+        listings = {group["id"]: listing for group, listing in zip(groups, pool.map(list_account, groups))}
+        check_known(groups, listings, writer)
+        futures = {pool.submit(crawl_account, group, writer, listings[group["id"]]): group for group in groups}
+
+        for future in as_completed(futures):
+            try:
+                status, detail = future.result()
+            except Exception as e:
+                status, detail = "failed", str(e)[:80]
+            record_result(results, futures[future], status, detail)
+            writer.record_account(futures[future]["id"], status, detail)
+
+    return results
+
+
+def crawl_and_record(group: dict, writer: PostWriter, results: tuple, listing):
+    # The async engine awaits the delays itself, so none are slept here
+    try:
+        status, detail = finish_account(group, writer, listing)
+    except Exception as e:
+        status, detail = "failed", str(e)[:80]
+    record_result(results, group, status, detail)
+    writer.record_account(group["id"], status, detail)
+
+
+class AccountProgress:
+    def __init__(self, group: dict, videos: list):
+        self.group = group
+        self.videos = videos
+        self.done = set()
+        self.cursor = 0
+        self.saved_titles = []
+        self.error = None
+        self.lock = threading.Lock()
+
+    def complete(self, video_id: str, writer: PostWriter, title: str = None):
+        with self.lock:
+            self.done.add(video_id)
+            if title is not None:
+                self.saved_titles.append(title)
+
+            # The watermark only moves past videos whose older siblings are all saved
+            while self.cursor < len(self.videos) and self.videos[self.cursor]["id"] in self.done:
+                entry = self.videos[self.cursor]
+                writer.advance_watermark(self.group["id"], entry["id"], entry["timestamp"])
+                self.cursor += 1
+
+    def fail(self, error: Exception):
+        with self.lock:
+            if self.error is None:
+                self.error = error
+
+    def result(self) -> tuple:
+        if self.error is not None:
+            return classify_error(self.error)
+        if len(self.saved_titles) == 1:
+            return "success", self.saved_titles[0][:50]
+        if self.saved_titles:
+            return "success", f"{len(self.saved_titles)} videos, latest: {self.saved_titles[-1][:40]}"
+        if self.videos:
+            return "skipped", "Already exists"
+        return "skipped", "No new videos"
+
+
+def discover_account(group: dict, writer: PostWriter, progress: dict) -> list:
+    username = group["tt_link"].replace("@", "")
+    logging.info(f"\n🎵 Discovering: {group['tt_name']} (@{username})")
+    journal.stage(group["id"], "discover")
+    random_delay()
+
+    try:
+        try:
+            videos = get_new_videos(username, group.get("last_video_ts"))
+        except Exception as e:
+            logging.error(f"❌ Error for {username}: {str(e)[:100]}")
+            if not recover_from_auth_error(str(e)):
+                raise
+            logging.info(f"🔄 Retrying @{username} after cookie refresh...")
+            time.sleep(random.randint(10, 20))
+            videos = get_new_videos(username, group.get("last_video_ts"))
+    finally:
+        random_delay(DELAY_MIN, DELAY_MAX + 30)
+
+    account = progress[group["id"]] = AccountProgress(group, videos)
+
+    return [
+        {
+            "account": account,
+            "entry": entry,
+            "url": build_video_url(username, entry["id"]),
+            "title": entry.get("title", ""),
+            "video_id": f"t_{username}_{entry['timestamp']}",
+        }
+        for entry in videos
+    ]
+
+
+def dedup_jobs(batch: list, writer: PostWriter) -> list:
+    known = writer.find_known([job["url"] for _, jobs in batch for job in jobs])
+
+    remaining = []
+    for group, jobs in batch:
+        pending = []
+        for job in jobs:
+            if job["url"] in known:
+                job["account"].complete(job["entry"]["id"], writer)
+            else:
+                pending.append(job)
+
+        if pending:
+            journal.stage(group["id"], "download")
+        else:
+            logging.info(f"⏭️ No new videos to download for {group['tt_link']}")
+        remaining.extend(pending)
+    return remaining
+
+
+def run_pipeline(groups: list, writer: PostWriter, cfg: dict) -> tuple:
+    progress = {}
+
+    def download(job):
+        # Streaming writes the final audio directly, leaving nothing for the transcode stage
+        job["media_path"] = download_audio(
+            job["url"], media_id(job["entry"]), extract_audio=audio_cfg["streaming"]
+        )
+        return job
+
+    def commit(job):
+        digest, audio_path = store_audio(job["media_path"])
+        writer.add(job["video_id"], job["title"], job["url"], audio_path, digest)
+        job["account"].complete(job["entry"]["id"], writer, job["title"])
+        logging.info(f"✅ Success: {audio_path}")
+
+    def on_error(stage, item, error):
+        if stage == "discover":
+            account = progress.setdefault(item["id"], AccountProgress(item, []))
+            label = item["tt_link"]
+        else:
+            account = item["account"]
+            label = item["url"]
+        logging.error(f"❌ {stage} failed for {label}: {str(error)[:100]}")
+        account.fail(error)
+
+    StagedPipeline(
+        cfg,
+        discover=lambda group: discover_account(group, writer, progress),
+        download=download,
+        transcode=None if audio_cfg["streaming"] else audio_processor(audio_cfg),
+        commit=commit,
+        on_error=on_error,
+        dedup=lambda batch: dedup_jobs(batch, writer),
+    ).run(groups)
+
+    results = ([], [], [])
+    for group in groups:
+        account = progress.get(group["id"])
+        status, detail = account.result() if account else ("failed", "Not processed")
+        if account and account.error is None:
+            schedule_next_poll(group, account.videos, writer)
+        record_result(results, group, status, detail)
+        writer.record_account(group["id"], status, detail)
+    return results
+
+
+def transcode_backlog(batch_size: int = None, after_id: int = 0):
+    batch_size = batch_size or audio_cfg["deferred_batch_size"]
+    # Archived audio is cold storage (possibly re-encoded to Opus) and stays as it is
+    archive_prefix = os.path.join(retention_cfg["archive_dir"], "") if retention_cfg["archive_dir"] else ""
+    batch = db.fetch_posts_without_mp3(batch_size, after_id, archive_prefix, audio_cfg["deferred_max_failures"])
+    if not batch:
+        return None
+
+    # Posts sharing a stored blob are converted once and all repointed
+    paths = list(dict.fromkeys(path for _, path in batch))
+    missing = [path for path in paths if not os.path.exists(path)]
+    paths = [path for path in paths if path not in missing]
+
+    logging.info(f"🎚️ Transcoding {len(paths)} stored audio file(s) to MP3...")
+    updates = []
+    failed = []
+
+    with ProcessPoolExecutor() as pool:
+        futures = {
+            pool.submit(convert_to_mp3, path, audio_cfg["mp3_quality"]): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            try:
+                updates.append((futures[future], future.result()))
+            except Exception as e:
+                failed.append(futures[future])
+                logging.error(f"❌ Transcode failed for {futures[future]}: {str(e)[:100]}")
+
+    # The originals are only removed once yt_post points at the MP3 copies
+    if not db.update_audio_paths(updates):
+        logging.error(f"❌ Could not repoint {len(updates)} post(s) to MP3, keeping the originals")
+        for _, new_path in updates:
+            os.remove(new_path)
+        return None
+
+    # A missing file never converts; a failed one gets deferred_max_failures runs before it is skipped
+    db.record_mp3_failures(missing, permanent=True)
+    db.record_mp3_failures(failed)
+    for old_path, new_path in updates:
+        os.remove(old_path)
+        audio_index.replace(old_path, new_path, os.path.getsize(new_path))
+    logging.info(f"✅ Transcoded {len(updates)}/{len(paths)} file(s), {len(missing)} missing")
+    return batch[-1][0]
+
+
+def run_transcode_backlog(max_batches: int = 0):
+    last_id = 0
+    batches = 0
+    while last_id is not None and (not max_batches or batches < max_batches):
+        last_id = transcode_backlog(after_id=last_id)
+        batches += 1
+
+
+def crawl_groups(groups: list, writer: PostWriter, config: dict, pipeline_cfg: dict):
+    if async_engine is not None:
+        if pipeline_cfg["enabled"]:
+            # Config is re-read every tick; the check in load_async_config only sees startup
+            logging.warning("⚠️ pipeline.enabled is ignored while the async engine is running")
+        results = ([], [], [])
+        listings = {}
+        # Same two rounds as the worker pool: list every account, check known URLs once, download
+        async_engine.crawl(
+            groups, lambda group: listings.__setitem__(group["id"], list_account(group, wait=False)),
+            before=lambda: pick_delay(), after=lambda: 0, concurrency=get_concurrency(config),
+        )
+        check_known(groups, listings, writer)
+        async_engine.crawl(
+            groups, lambda group: crawl_and_record(group, writer, results, listings[group["id"]]),
+            before=lambda: 0, after=lambda: pick_delay(DELAY_MIN, DELAY_MAX + 30),
+            concurrency=get_concurrency(config),
+        )
+        return results
+
+    if pipeline_cfg["enabled"]:
+        logging.info(f"🚦 Crawling {len(groups)} accounts through the staged pipeline")
+        return run_pipeline(groups, writer, pipeline_cfg)
+
+    concurrency = get_concurrency(config)
+    logging.info(f"🚦 Crawling {len(groups)} accounts with {concurrency} worker(s)")
+    return run_worker_pool(groups, writer, concurrency)
+
+
+def run_cluster(writer: PostWriter, config: dict, pipeline_cfg: dict, cluster_cfg: dict, done_ids: set):
+    node_id = cluster_cfg["node_id"]
+    lease_seconds = int(cluster_cfg["lease_seconds"])
+    slack_seconds = adaptive_cfg["due_slack_minutes"] * 60
+    heartbeat = NodeHeartbeat(node_id, int(cluster_cfg["heartbeat_seconds"]), lease_seconds)
+    heartbeat.start()
+
+    success_list, skipped_list, failed_list = [], [], []
+    processed_ids = list(done_ids)
+    # Accounts another node finished after this run started are not crawled a second time
+    run_started = db.current_timestamp()
+    logging.info(f"🛰️ Node {node_id} leasing accounts in batches of {cluster_cfg['batch_size']}")
+
+    try:
+        while True:
+            groups = db.lease_groups(
+                node_id, int(cluster_cfg["batch_size"]), lease_seconds,
+                due_only=adaptive_cfg["enabled"], slack_seconds=slack_seconds,
+                exclude_ids=processed_ids, crawled_since=run_started,
+            )
+            if not groups:
+                break
+
+            logging.info(f"🔒 Node {node_id} leased {len(groups)} account(s)")
+            success, skipped, failed = crawl_groups(groups, writer, config, pipeline_cfg)
+            success_list += success
+            skipped_list += skipped
+            failed_list += failed
+
+            # Posts and watermarks must be durable before another node can pick the account up
+            writer.flush()
+            group_ids = [g["id"] for g in groups]
+            db.release_leases(node_id, group_ids, crawled=True)
+            processed_ids += group_ids
+    finally:
+        heartbeat.stop()
+
+    logging.info(f"🛰️ Node {node_id} finished {len(processed_ids) - len(done_ids)} account(s)")
+    return success_list, skipped_list, failed_list
+
+
 def main():
-    conn = db.get_connection()
-    with conn.cursor() as cur:
-        cur.execute("SELECT tt_link, tt_name FROM tt_group")
-        groups = cur.fetchall()
-    conn.close()
+    global adaptive_cfg, audio_cfg, storage_cfg, download_cfg, retention_cfg
+
+    db.ensure_schema()
 
-    success_list, failed_list, skipped_list = [], [], []
+    config = load_config()
+    adaptive_cfg = load_adaptive_config(config)
+    limiter.configure(config.get("rate_limits", {}))
+    identities.configure(load_identity_config(config), is_auth_error, ydl_pool.recycle)
+    pipeline_cfg = load_pipeline_config(config)
+    audio_cfg = load_audio_config(config)
+    storage_cfg = load_storage_config(config)
+    download_cfg = load_download_config(config)
+    retention_cfg = load_retention_config(config)
+    audio_index.configure(retention_cfg)
+
+    cluster_cfg = load_cluster_config(config)
+    batch_size = int(config.get("crawler", {}).get("db_batch_size", DEFAULT_DB_BATCH_SIZE))
+
+    journal_cfg = load_journal_config(config)
+
+    if cluster_cfg["enabled"]:
+        done_ids = journal.open(cluster_cfg["journal_key"], journal_cfg)
+        writer = PostWriter(batch_size)
+        finish_crawl(writer, run_cluster(writer, config, pipeline_cfg, cluster_cfg, done_ids))
+    else:
+        if adaptive_cfg["enabled"]:
+            groups = db.fetch_due_groups(adaptive_cfg["due_slack_minutes"] * 60)
+        else:
+            groups = db.fetch_groups()
 
-    for username, name in groups:
-        status, detail = process_single_account(username, name)
+        if groups:
+            done_ids = journal.open(socket.gethostname(), journal_cfg)
+            groups = [g for g in groups if g["id"] not in done_ids]
 
-        if status == "success":
-            success_list.append((username, name, detail))
-        elif status == "skipped":
-            skipped_list.append((username, name, detail))
+            writer = PostWriter(batch_size)
+            finish_crawl(writer, crawl_groups(groups, writer, config, pipeline_cfg))
         else:
-            failed_list.append((username, name, detail))
+            logging.info("😴 No accounts due, nothing to crawl")
+
+    # Storage upkeep runs every tick, including ticks with nothing due
+    run_maintenance()
+
+
+def finish_crawl(writer: PostWriter, results: tuple):
+    writer.flush()
+    journal.finish()
+    log_summary(*results)
+    limiter.log_state()
+
+    api_health.save()
+    logging.info(f"🩺 Strategy health: {api_health.summary()}")
+    logging.info(f"🧰 yt-dlp handles: {ydl_pool.stats()}")
+    logging.info(f"⏱️ Stage time (total/calls): {metrics.summary()}")
+    if identities.enabled:
+        logging.info(f"🪪 Identity usage: {identities.summary()}")
+
+
+def run_maintenance():
+    cleanup_stale_parts(AUDIO_DIR, download_cfg["part_max_age_hours"])
+    enforce_retention(audio_index, retention_cfg, AUDIO_DIR)
+
+    if audio_cfg["output"] == "native" and audio_cfg["deferred_mp3"]:
+        run_transcode_backlog(audio_cfg["deferred_batches_per_run"])
+
+
+def async_enabled(config: dict) -> bool:
+    return bool(config.get("async_engine", {}).get("enabled", False))
 
-        random_delay(DELAY_MIN, DELAY_MAX + 30)
 
-    log_summary(success_list, skipped_list, failed_list)
+def start_async_engine(config: dict):
+    global async_engine
+    # asyncio costs ~70ms to import, so it is only loaded when the engine is enabled
+    from async_engine import AsyncEngine, load_async_config
+
+    async_engine = AsyncEngine(load_async_config(config))
+    return async_engine
+
+
+def run_once():
+    config = load_config()
+    if async_enabled(config):
+        start_async_engine(config).run_once(main)
+    else:
+        main()
 
 
 def create_trigger(scheduler_cfg: dict):
+    from apscheduler.triggers.interval import IntervalTrigger
+    from apscheduler.triggers.cron import CronTrigger
+    from apscheduler.triggers.date import DateTrigger
+
     schedule_type = scheduler_cfg.get("type", "interval")
     settings = scheduler_cfg.get("settings", {})
 
@@ -454,6 +1211,17 @@ def run_scheduler():
         logging.info("Scheduler disabled")
         return
 
+    start_metrics_server(load_metrics_config(config))
+
+    if async_enabled(config):
+        start_async_engine(config).serve(
+            create_trigger(scheduler_cfg), main,
+            scheduler_cfg.get("timezone", "Asia/Ho_Chi_Minh"), scheduler_cfg.get("run_on_startup", False),
+        )
+        return
+
+    from apscheduler.schedulers.blocking import BlockingScheduler
+
     scheduler = BlockingScheduler(timezone=scheduler_cfg.get("timezone", "Asia/Ho_Chi_Minh"))
     trigger = create_trigger(scheduler_cfg)
     scheduler.add_job(main, trigger, id="tiktok_downloader", replace_existing=True)
@@ -470,7 +1238,23 @@ def run_scheduler():
 
 
 if __name__ == "__main__":
+    setup_logging()
+
     if len(sys.argv) > 1 and sys.argv[1] == "--once":
-        main()
+        run_once()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--history":
+        log_run_history()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--retention":
+        retention_cfg = load_retention_config(load_config())
+        if not retention_cfg["enabled"]:
+            logging.info("🧊 Retention is disabled in scheduler_config.json")
+        audio_index.configure(retention_cfg)
+        enforce_retention(audio_index, retention_cfg, AUDIO_DIR)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--transcode-mp3":
+        config = load_config()
+        audio_cfg = load_audio_config(config)
+        retention_cfg = load_retention_config(config)
+        audio_index.configure(retention_cfg)
+        run_transcode_backlog()
     else:
         run_scheduler()
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import subprocess
+from functools import partial
+
+from metrics import metrics
+
+MP3_QUALITY = "192"
+AUDIO_OUTPUTS = ("mp3", "native")
+STREAM_CHUNK = 256 * 1024
+FFMPEG_TIMEOUT = 300
+# TikTok serves AAC, which fits in m4a; anything else goes into Matroska
+NATIVE_CONTAINERS = ("m4a", "mka")
+COPY_AUDIO_ARGS = ["-map", "0:a:0", "-codec:a", "copy"]
+
+DEFAULT_AUDIO_CONFIG = {
+    "output": "mp3",
+    "mp3_quality": MP3_QUALITY,
+    "deferred_mp3": False,
+    "deferred_batch_size": 50,
+    "deferred_batches_per_run": 4,
+    "deferred_max_failures": 3,
+    "streaming": False,
+}
+
+
+def load_audio_config(config: dict) -> dict:
+    cfg = dict(DEFAULT_AUDIO_CONFIG)
+    cfg.update(config.get("audio", {}))
+    if cfg["output"] not in AUDIO_OUTPUTS:
+        raise ValueError(f"Unknown audio output: {cfg['output']}")
+    return cfg
+
+
+def run_ffmpeg(src_path: str, dst_path: str, codec_args: list):
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-i", src_path, "-vn", *codec_args, dst_path]
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=FFMPEG_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        remove_quietly(dst_path)
+        raise RuntimeError(f"ffmpeg timed out after {FFMPEG_TIMEOUT}s")
+    if result.returncode != 0:
+        remove_quietly(dst_path)
+        raise RuntimeError(f"ffmpeg failed: {result.stderr[:200]}")
+
+
+def remove_quietly(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def output_format(cfg: dict, acodec: str = None) -> tuple:
+    if cfg["output"] == "mp3":
+        return "mp3", ["-codec:a", "libmp3lame", "-b:a", f"{cfg['mp3_quality']}k"]
+
+    codec = (acodec or "aac").lower()
+    container = NATIVE_CONTAINERS[0] if codec.startswith(("aac", "mp4a")) else NATIVE_CONTAINERS[1]
+    return container, COPY_AUDIO_ARGS
+
+
+def stream_to_ffmpeg(source, dst_path: str, codec_args: list) -> int:
+    # Media is piped into ffmpeg's stdin, so only the audio output touches disk
+    base, ext = os.path.splitext(dst_path)
+    part_path = f"{base}.part{ext}"
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-i", "pipe:0", "-vn", *codec_args, part_path]
+
+    written = 0
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr)
+        try:
+            for chunk in iter(lambda: source.read(STREAM_CHUNK), b""):
+                proc.stdin.write(chunk)
+                written += len(chunk)
+        except BrokenPipeError:
+            # ffmpeg gave up early; its exit code and stderr say why
+            pass
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            remove_quietly(part_path)
+            raise
+
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        # Encoding overlaps the transfer; only what is left after the last chunk is transcode time
+        try:
+            with metrics.span("transcode"):
+                returncode = proc.wait(timeout=FFMPEG_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            remove_quietly(part_path)
+            raise RuntimeError(f"ffmpeg timed out after {FFMPEG_TIMEOUT}s")
+
+        if returncode != 0:
+            stderr.seek(0)
+            remove_quietly(part_path)
+            raise RuntimeError(f"ffmpeg failed: {stderr.read().decode('utf-8', 'replace').strip()[:200]}")
+
+    os.replace(part_path, dst_path)
+    return written
+
+
+def convert_to_mp3(src_path: str, quality: str = MP3_QUALITY) -> str:
+    # Leaves the source in place, for callers that must repoint references first
+    dst_path = os.path.splitext(src_path)[0] + ".mp3"
+    if dst_path != src_path:
+        run_ffmpeg(src_path, dst_path, ["-codec:a", "libmp3lame", "-b:a", f"{quality}k"])
+    return dst_path
+
+
+def transcode_to_mp3(src_path: str, quality: str = MP3_QUALITY) -> str:
+    dst_path = convert_to_mp3(src_path, quality)
+    if dst_path != src_path:
+        os.remove(src_path)
+    return dst_path
+
+
+def extract_native_audio(src_path: str) -> str:
+    base, ext = os.path.splitext(src_path)
+    if ext.lstrip(".") in ("m4a", "mka", "aac", "mp3", "opus"):
+        return src_path
+
+    last_error = None
+    for container in NATIVE_CONTAINERS:
+        try:
+            run_ffmpeg(src_path, f"{base}.{container}", COPY_AUDIO_ARGS)
+        except RuntimeError as e:
+            last_error = e
+            continue
+        os.remove(src_path)
+        return f"{base}.{container}"
+
+    raise last_error
+
+
+def audio_processor(cfg: dict):
+    if cfg["output"] == "native":
+        return extract_native_audio
+    return partial(transcode_to_mp3, quality=cfg["mp3_quality"])
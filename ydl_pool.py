@@ -0,0 +1,109 @@
+import json
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+MAX_IDLE_PER_PROFILE = 8
+
+# Keys that change on every call and are applied to a checked-out handle instead
+PER_CALL_KEYS = ("outtmpl",)
+
+
+class YoutubeDLPool:
+    def __init__(self, max_idle: int = MAX_IDLE_PER_PROFILE):
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.cookie_jars = {}
+        self.generation = 0
+        self.created = 0
+        self.reused = 0
+
+    def _profile_key(self, opts: dict, cookies: str) -> str:
+        profile = {k: v for k, v in opts.items() if k not in PER_CALL_KEYS}
+        return json.dumps([profile, cookies], sort_keys=True, default=str)
+
+    def _cookie_jar(self, cookies: str):
+        from yt_dlp.cookies import YoutubeDLCookieJar
+
+        with self.lock:
+            jar = self.cookie_jars.get(cookies)
+            if jar is None:
+                jar = YoutubeDLCookieJar(cookies)
+                jar.load()
+                self.cookie_jars[cookies] = jar
+            return jar
+
+    def _create(self, opts: dict, cookies: str):
+        # yt-dlp takes ~0.1s to import, so runs with nothing to crawl never load it
+        import yt_dlp
+
+        profile = {k: v for k, v in opts.items() if k not in PER_CALL_KEYS}
+        ydl = yt_dlp.YoutubeDL(profile)
+        if cookies:
+            # One jar per cookie file, shared by every handle of this generation
+            ydl.cookiejar = self._cookie_jar(cookies)
+        return ydl
+
+    @contextmanager
+    def acquire(self, opts: dict, cookies: str = None):
+        key = self._profile_key(opts, cookies)
+
+        with self.lock:
+            handles = self.idle.get(key)
+            ydl = handles.pop() if handles else None
+            generation = self.generation
+            if ydl is None:
+                self.created += 1
+            else:
+                self.reused += 1
+
+        if ydl is None:
+            ydl = self._create(opts, cookies)
+
+        if "outtmpl" in opts:
+            ydl.params["outtmpl"]["default"] = opts["outtmpl"]
+
+        try:
+            yield ydl
+        finally:
+            with self.lock:
+                handles = self.idle.setdefault(key, [])
+                keep = generation == self.generation and len(handles) < self.max_idle
+                if keep:
+                    handles.append(ydl)
+            if not keep:
+                ydl.close()
+
+    def recycle(self):
+        with self.lock:
+            self.generation += 1
+            handles = [ydl for pool in self.idle.values() for ydl in pool]
+            self.idle = {}
+            self.cookie_jars = {}
+
+        for ydl in handles:
+            ydl.close()
+        logging.info(f"♻️ Recycled {len(handles)} yt-dlp handle(s)")
+
+    def close(self):
+        with self.lock:
+            handles = [ydl for pool in self.idle.values() for ydl in pool]
+            self.idle = {}
+
+        for ydl in handles:
+            ydl.close()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "idle": sum(len(pool) for pool in self.idle.values()),
+                "profiles": len(self.idle),
+                "created": self.created,
+                "reused": self.reused,
+            }
+
+
+ydl_pool = YoutubeDLPool()
+atexit.register(ydl_pool.close)